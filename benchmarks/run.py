@@ -0,0 +1,235 @@
+"""Benchmarks for the render, rain, soil, collision and setup hot paths.
+
+Run from this directory (asset paths are relative to a sibling of ``graphics``)::
+
+    python run.py --output before.json
+    python run.py --output after.json --compare before.json
+
+Every benchmark runs on the shipped map and on the map replicated 2x2 (4x sprites) and 4x4 (16x sprites).
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+from time import perf_counter
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pygame
+
+from src import settings
+from src.level import Level, Rain
+from src.level.level import CameraGroup
+from src.level.soil import CROPS, FARMABLE, PLANTED, TILLED, WATERED
+from src.player import PlayerInventoryManager
+from src.support import asset_cache
+
+SCALES = (1, 4, 16)
+DT = 1 / 60
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds plus the matching calls (or frames) per second."""
+    samples_ms = sorted(sample * 1000 for sample in samples)
+
+    def percentile(p):
+        return samples_ms[min(len(samples_ms) - 1, round(p / 100 * (len(samples_ms) - 1)))]
+
+    mean = sum(samples_ms) / len(samples_ms)
+    return {
+        'calls': len(samples_ms),
+        'mean_ms': mean,
+        'p50_ms': percentile(50),
+        'p90_ms': percentile(90),
+        'p99_ms': percentile(99),
+        'max_ms': samples_ms[-1],
+        'per_second': 1000 / mean if mean > 0 else math.inf,
+    }
+
+
+def measure(func, calls, warmup=5):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(calls):
+        start = perf_counter()
+        func()
+        samples.append(perf_counter() - start)
+    return summarize(samples)
+
+
+def replicate_world(level, scale):
+    """Adds copies of the map next to it and tiles the soil grid so the world holds scale times the objects.
+
+    Only the chunks around the player are materialized, so draw and update costs should not grow with scale.
+    """
+    side = math.isqrt(scale)
+    world_w, world_h = asset_cache.image('../graphics/world/ground.png').get_size()
+    tilemap = asset_cache.tilemap('../data/map.tmx')
+    for copy_x in range(side):
+        for copy_y in range(side):
+            if copy_x == copy_y == 0:
+                continue
+            level.add_map_objects(tilemap, (copy_x * world_w, copy_y * world_h))
+
+    soil_layer = level.soil_layer
+    soil_layer.grid = np.tile(soil_layer.grid, (side, side))
+    soil_layer.plant_type = np.tile(soil_layer.plant_type, (side, side))
+    soil_layer.plant_age = np.tile(soil_layer.plant_age, (side, side))
+
+
+def build_level(scale):
+    asset_cache.clear()
+    random.seed(0)
+    start = perf_counter()
+    level = Level(PlayerInventoryManager(), seed=0)
+    if scale > 1:
+        replicate_world(level, scale)
+    level.all_sprites.custom_draw(level.player)
+    return level, perf_counter() - start
+
+
+def bench_setup(scale, calls):
+    return summarize([build_level(scale)[1] for _ in range(calls)])
+
+
+def bench_custom_draw(level, calls):
+    return measure(lambda: level.all_sprites.custom_draw(level.player), calls)
+
+
+def bench_frame(level, calls):
+    return measure(lambda: level.run(DT), calls)
+
+
+def bench_rain_update(scale, calls):
+    rain = Rain(CameraGroup(), seed=0, capacity=settings.RAIN_CAPACITY * scale)
+    side = math.isqrt(scale)
+    rain.floor_w *= side
+    rain.floor_h *= side
+    rain.spawn_rate *= scale
+    return measure(lambda: rain.update(DT), calls, warmup=60)
+
+
+def bench_soil(level, calls):
+    soil_layer = level.soil_layer
+    farmable = [((x + 0.5) * settings.TILE_SIZE, (y + 0.5) * settings.TILE_SIZE)
+                for y, x in np.argwhere(soil_layer.grid & FARMABLE).tolist()]
+    random.Random(0).shuffle(farmable)
+    calls = min(calls, len(farmable) - 5)
+
+    targets = iter(farmable)
+    results = {'get_hit': measure(lambda: soil_layer.get_hit(next(targets)), calls)}
+
+    tilled = iter([((x + 0.5) * settings.TILE_SIZE, (y + 0.5) * settings.TILE_SIZE)
+                   for y, x in np.argwhere(soil_layer.grid & TILLED).tolist()])
+    results['water'] = measure(lambda: soil_layer.water(next(tilled)), calls)
+    results['create_soil_tiles'] = measure(soil_layer.create_soil_tiles, max(calls // 10, 5))
+    soil_layer.remove_water()
+    return results
+
+
+def bench_crop_grow(level, calls):
+    """One growth step with a watered plant on every tile of the grid."""
+    soil_layer = level.soil_layer
+    grid, plant_type, plant_age = soil_layer.grid, soil_layer.plant_type, soil_layer.plant_age
+    soil_layer.grid = grid | TILLED | PLANTED | WATERED
+    soil_layer.plant_type = np.random.default_rng(0).integers(1, len(CROPS) + 1, grid.shape, dtype=np.uint8)
+    soil_layer.plant_age = np.zeros(grid.shape, dtype=np.float32)
+
+    def grow():
+        soil_layer.plant_age[:] = 0
+        soil_layer.grow()
+
+    result = measure(grow, calls)
+    result['plants'] = int(grid.size)
+    soil_layer.grid, soil_layer.plant_type, soil_layer.plant_age = grid, plant_type, plant_age
+    return result
+
+
+def bench_collision(level, calls):
+    player = level.player
+    player.direction.update(1, 0)
+
+    def collide():
+        player.collision('horizontal')
+        player.collision('vertical')
+
+    return measure(collide, calls)
+
+
+def run(calls, scales):
+    results = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': np.__version__,
+        'calls': calls,
+        'scales': {},
+    }
+
+    for scale in scales:
+        print(f'scale {scale}x', flush=True)
+        level, _ = build_level(scale)
+        level.raining = False
+        scale_results = {
+            'sprites': len(level.all_sprites),
+            'objects': len(level.world),
+            'setup': bench_setup(scale, 3),
+            'custom_draw': bench_custom_draw(level, calls),
+            'collision': bench_collision(level, calls),
+            'rain_update': bench_rain_update(scale, calls),
+        }
+        for name, result in bench_soil(level, calls).items():
+            scale_results[f'soil_{name}'] = result
+        scale_results['crop_grow'] = bench_crop_grow(level, calls)
+        level.raining = True
+        scale_results['frame'] = bench_frame(level, calls)
+        results['scales'][str(scale)] = scale_results
+    return results
+
+
+def print_results(results, baseline=None):
+    for scale, scale_results in results['scales'].items():
+        print(f"\n{scale}x ({scale_results['objects']} map objects, {scale_results['sprites']} sprites loaded)")
+        print(f"  {'benchmark':<24}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'per sec':>12}{'vs base':>10}")
+        for name, result in scale_results.items():
+            if name in ('sprites', 'objects'):
+                continue
+            line = (f"  {name:<24}{result['p50_ms']:>10.3f}{result['p90_ms']:>10.3f}"
+                    f"{result['p99_ms']:>10.3f}{result['per_second']:>12.1f}")
+            base = (baseline or {}).get('scales', {}).get(scale, {}).get(name)
+            if base:
+                line += f"{(result['p50_ms'] / base['p50_ms'] - 1) * 100:>+9.1f}%"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200, help='timed calls per benchmark')
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES, help='sprite count multipliers')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare p50 latencies against')
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT))
+
+    results = run(args.calls, args.scales)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,185 @@
+import argparse
+import os
+import random
 import sys
+import time
+
 import pygame
 
 from src.level import Level
+from src.level.savegame import Autosaver, SaveSnapshot, read_save
+from src.controls import InputTrace, KeyboardControls, RecordingControls, ScriptedControls
+from src.loading import LoadingScreen
+from src.support import asset_cache
 from src.player import PlayerInventoryManager
+from src.profiler import profiler
 from src.settings import *
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, seed=None, controls=None, profile_output=None, save_path=None,
+                 record_path=None):
+        if save_path is not None and record_path is not None:
+            raise ValueError('a recording starts from a new world, it cannot load a save')
+        self.profile_output = profile_output
+        profiler.recording = profile_output is not None
+        if headless:
+            # SDL reads these on init, no window or audio device is opened
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        self.record_path = record_path
+        self.trace = None
+        if record_path is not None:
+            # a replay needs the seed, so a recorded session always has one
+            seed = random.randrange(1 << 32) if seed is None else seed
+            self.trace = InputTrace(1 / SIMULATION_RATE, seed)
+            controls = RecordingControls(KeyboardControls() if controls is None else controls, self.trace)
+        if seed is not None:
+            random.seed(seed)
+
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Pydew Valley')
         self.clock = pygame.time.Clock()
+        self.tick_dt = 1 / SIMULATION_RATE
+        self._accumulator = 0.0
+        # decode every image on worker threads first, the level then only converts them
+        LoadingScreen(self.screen).run()
         self._player_inventory_manager = PlayerInventoryManager()
-        self.level = Level(self._player_inventory_manager)
+        self.level = Level(self._player_inventory_manager, controls=controls, seed=seed)
+        # the level took what it needs, images asked for later (e.g. stumps) are decoded on demand
+        asset_cache.discard_preloaded()
+
+        self.autosaver = None
+        if save_path is not None:
+            self.load(save_path)
+            self.autosaver = Autosaver(self.level, save_path)
+            self.autosaver.start()
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        try:
+            read_save(path).apply(self.level)
+        except (OSError, ValueError) as error:
+            # the next autosave replaces it
+            print(f'could not load {path}: {error}')
 
     def run(self):
+        if self.trace is not None:
+            self.trace.dt = self.tick_dt
+        profiler.start()
         while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+            with profiler.scope('events'):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.quit()
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                        profiler.toggle_hud()
 
-            dt = self.clock.tick() / 1000
+            self._accumulator += min(self.clock.tick(FPS_CAP) / 1000, MAX_FRAME_TIME)
+            while self._accumulator >= self.tick_dt:
+                self.level.update(self.tick_dt)
+                self._accumulator -= self.tick_dt
+            self.level.draw(self._accumulator / self.tick_dt, partial=not profiler.hud_visible)
+            self.present()
+
+    def run_headless(self, frames, dt=1 / 60):
+        """Steps the level frames times with a fixed dt as fast as possible, returns simulated frames per second."""
+        if self.trace is not None:
+            self.trace.dt = dt
+        profiler.start()
+        start = time.perf_counter()
+        for _ in range(frames):
+            pygame.event.pump()
             self.level.run(dt)
-            pygame.display.update()
+            self.present()
+        elapsed = time.perf_counter() - start
+        self.close()
+        return frames / elapsed if elapsed > 0 else float('inf')
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.digest = SaveSnapshot.take(self.level).digest()
+            self.trace.write(self.record_path)
+        if self.autosaver is not None:
+            self.autosaver.close()
+        if self.profile_output:
+            profiler.dump(self.profile_output)
+
+    def present(self):
+        if profiler.hud_visible:
+            with profiler.scope('hud'):
+                profiler.draw_hud(self.screen, self.level.all_sprites.layer_counts())
+        with profiler.scope('display'):
+            if self.level.dirty_rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(self.level.dirty_rects)
+        profiler.end_frame()
+
+    def quit(self):
+        self.close()
+        pygame.quit()
+        sys.exit()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Pydew Valley')
+    parser.add_argument('--headless', action='store_true', help='run without a window at a fixed dt')
+    parser.add_argument('--frames', type=int, default=600, help='frames to simulate in headless mode')
+    parser.add_argument('--dt', type=float, default=1 / 60, help='fixed frame time in seconds for headless mode')
+    parser.add_argument('--seed', type=int, default=None, help='seed for rain and fruit randomness')
+    parser.add_argument('--script', default=None, help='JSON list of [frames, [actions]] steps to play as input')
+    parser.add_argument('--save', default=None,
+                        help=f'world save file to load and autosave to '
+                             f'(default {SAVE_PATH}, none in headless mode; not allowed when recording, ignored when replaying)')
+    parser.add_argument('--record', default=None, help='record every tick of input to this trace file on exit')
+    parser.add_argument('--replay', default=None,
+                        help='play back a recorded trace; with --headless at maximum speed, checking the final state')
+    parser.add_argument('--profile-output', default=None,
+                        help='write per-frame timings to this .csv or .json file on exit (F3 toggles the HUD)')
+    args = parser.parse_args()
+    if args.record is not None and args.save is not None:
+        # the trace does not hold the saved world, so its replay would start elsewhere
+        parser.error('--record starts from a new world and cannot be combined with --save')
+    return args
+
+
+def replay(args):
+    """Plays back the trace at args.replay, returns the exit status: 1 when a headless replay ends elsewhere."""
+    trace = InputTrace.read(args.replay)
+    game = Game(headless=args.headless, seed=trace.seed, controls=trace.controls(),
+                profile_output=args.profile_output)
+    if not args.headless:
+        game.tick_dt = trace.dt
+        # returns only by exiting, when the window is closed
+        game.run()
+
+    fps = game.run_headless(trace.ticks, trace.dt)
+    matches = SaveSnapshot.take(game.level).digest() == trace.digest
+    print(f'{trace.ticks} ticks at dt={trace.dt:.4f}s: {fps:.1f} simulated frames/s, '
+          f'final state {"matches" if matches else "DIFFERS from"} the recording')
+    return 0 if matches else 1
 
 
 if __name__ == '__main__':
-    game = Game()
-    game.run()
+    args = parse_args()
+    if args.replay is not None:
+        sys.exit(replay(args))
+
+    controls = None
+    if args.script is not None:
+        controls = ScriptedControls.from_file(args.script)
+
+    if args.headless:
+        game = Game(headless=True, seed=0 if args.seed is None else args.seed, controls=controls,
+                    profile_output=args.profile_output, save_path=args.save, record_path=args.record)
+        fps = game.run_headless(args.frames, args.dt)
+        print(f'{args.frames} frames at dt={args.dt:.4f}s: {fps:.1f} simulated frames/s')
+    else:
+        # recordings start from a new world, so that their replays can too
+        game = Game(seed=args.seed, controls=controls, profile_output=args.profile_output,
+                    save_path=SAVE_PATH if args.save is None and args.record is None else args.save,
+                    record_path=args.record)
+        game.run()
@@ -0,0 +1,78 @@
+from src.support import asset_cache
+
+
+class AnimationClip:
+    """Named list of frames played back at a fixed rate."""
+
+    def __init__(self, name, frames, fps) -> None:
+        super().__init__()
+        self.name = name
+        self.frames = frames
+        self.fps = fps
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class SharedClock:
+    """Playback position of a clip shared by every sprite showing it in lockstep (e.g. water tiles)."""
+
+    def __init__(self, clip: AnimationClip) -> None:
+        super().__init__()
+        self.clip = clip
+        self.frame_index = 0
+        self.frame = clip.frames[0]
+
+    def tick(self, dt):
+        self.frame_index += self.clip.fps * dt
+        if self.frame_index >= len(self.clip):
+            self.frame_index = 0
+        self.frame = self.clip.frames[int(self.frame_index)]
+
+
+class Animator:
+    """Per-instance playback over a set of clips, for sprites animating on their own (player, NPCs)."""
+
+    def __init__(self, clips) -> None:
+        super().__init__()
+        self.clips = clips
+        self.frame_index = 0
+
+    def reset(self):
+        self.frame_index = 0
+
+    def frame(self, name):
+        return self.clips[name].frames[int(self.frame_index)]
+
+    def advance(self, name, dt):
+        clip = self.clips[name]
+        self.frame_index += clip.fps * dt
+        if self.frame_index >= len(clip):
+            self.frame_index = 0
+        return clip.frames[int(self.frame_index)]
+
+
+class ClipRegistry:
+    """Loads every clip once and ticks the shared clocks once per frame."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._clips = {}
+        self._clocks = {}
+
+    def load(self, name, path, fps):
+        if name not in self._clips:
+            self._clips[name] = AnimationClip(name, asset_cache.folder(path), fps)
+        return self._clips[name]
+
+    def shared_clock(self, clip: AnimationClip):
+        if clip.name not in self._clocks:
+            self._clocks[clip.name] = SharedClock(clip)
+        return self._clocks[clip.name]
+
+    def tick(self, dt):
+        for clock in self._clocks.values():
+            clock.tick(dt)
+
+
+clip_registry = ClipRegistry()
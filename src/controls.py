@@ -0,0 +1,136 @@
+import json
+import os
+import struct
+
+import pygame
+
+# every action the player can trigger, in a fixed order
+ACTIONS = ('up', 'down', 'left', 'right', 'tool', 'seed', 'switch_tool', 'switch_seed', 'interact')
+
+# trace file layout: header, then runs of ticks that share the same actions
+TRACE_MAGIC = b'PVIT'
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct('<4sHdq20sI')
+TRACE_RUN = struct.Struct('<IH')
+
+KEY_BINDINGS = {
+    'up': pygame.K_UP,
+    'down': pygame.K_DOWN,
+    'left': pygame.K_LEFT,
+    'right': pygame.K_RIGHT,
+    'tool': pygame.K_SPACE,
+    'seed': pygame.K_LCTRL,
+    'switch_tool': pygame.K_q,
+    'switch_seed': pygame.K_e,
+    'interact': pygame.K_RETURN,
+}
+
+
+class KeyboardControls:
+    """Reads the live keyboard state."""
+
+    def actions(self):
+        keys = pygame.key.get_pressed()
+        return frozenset(action for action, key in KEY_BINDINGS.items() if keys[key])
+
+
+class ScriptedControls:
+    """Plays back a script of ``(frames, actions)`` steps, one frame per ``actions()`` call, idling after it ends."""
+
+    def __init__(self, script) -> None:
+        super().__init__()
+        self._frames = []
+        for frames, actions in script:
+            unknown = set(actions) - set(ACTIONS)
+            if unknown:
+                raise ValueError(f"Unknown actions in script: {sorted(unknown)}")
+            self._frames.extend([frozenset(actions)] * frames)
+        self._frame = 0
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as script_file:
+            return cls(json.load(script_file))
+
+    def actions(self):
+        if self._frame >= len(self._frames):
+            return frozenset()
+        actions = self._frames[self._frame]
+        self._frame += 1
+        return actions
+
+
+def action_mask(actions):
+    """Bitmask of actions, bit i standing for ACTIONS[i]."""
+    return sum(1 << ACTIONS.index(action) for action in actions)
+
+
+def mask_actions(mask):
+    return frozenset(action for bit, action in enumerate(ACTIONS) if mask & 1 << bit)
+
+
+class InputTrace:
+    """Actions of every tick of a session with the fixed dt and seed it ran with, enough to replay it exactly.
+
+    Ticks are stored as ``[ticks, action mask]`` runs; digest is the final world state the replay has to reach.
+    """
+
+    def __init__(self, dt, seed, runs=None, digest=b'') -> None:
+        super().__init__()
+        self.dt = dt
+        self.seed = seed
+        self.runs = runs if runs is not None else []
+        self.digest = digest
+
+    @property
+    def ticks(self):
+        return sum(ticks for ticks, _ in self.runs)
+
+    def append(self, actions):
+        mask = action_mask(actions)
+        if self.runs and self.runs[-1][1] == mask:
+            self.runs[-1][0] += 1
+        else:
+            self.runs.append([1, mask])
+
+    def controls(self):
+        return ScriptedControls([(ticks, mask_actions(mask)) for ticks, mask in self.runs])
+
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as trace_file:
+            trace_file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, self.dt, self.seed,
+                                               self.digest, len(self.runs)))
+            trace_file.write(b''.join(TRACE_RUN.pack(ticks, mask) for ticks, mask in self.runs))
+
+    @classmethod
+    def read(cls, path):
+        """Trace stored at path; raises ValueError when it is not a readable trace of this version."""
+        with open(path, 'rb') as trace_file:
+            data = trace_file.read()
+        try:
+            magic, version, dt, seed, digest, count = TRACE_HEADER.unpack_from(data)
+            if magic != TRACE_MAGIC or version != TRACE_VERSION:
+                raise ValueError(f'not a version {TRACE_VERSION} input trace')
+            runs = [list(run) for run in TRACE_RUN.iter_unpack(data[TRACE_HEADER.size:])]
+        except struct.error as error:
+            raise ValueError(f'truncated input trace: {error}') from error
+        if len(runs) != count:
+            raise ValueError(f'truncated input trace: {len(runs)} of {count} runs')
+        return cls(dt, seed, runs, digest)
+
+
+class RecordingControls:
+    """Passes on the actions of source controls, appending each call's actions to trace as one tick."""
+
+    def __init__(self, source, trace: InputTrace) -> None:
+        super().__init__()
+        self.source = source
+        self.trace = trace
+
+    def actions(self):
+        actions = self.source.actions()
+        self.trace.append(actions)
+        return actions
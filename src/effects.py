@@ -0,0 +1,73 @@
+from functools import partial
+from weakref import WeakKeyDictionary
+
+import pygame
+
+from src import settings
+from src.timer import Scheduler, scheduler
+
+
+class Particle(pygame.sprite.Sprite):
+    """Short-lived sprite owned by Effects, reused for every emission instead of being allocated."""
+    dynamic = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.image = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.z = settings.LAYERS['main']
+        self.hitbox = None
+
+
+class Effects:
+    """Silhouette surfaces cached per source surface and a pool of particle sprites to flash them.
+
+    Silhouettes are cached weakly, so they go away with their source surface.
+    """
+
+    def __init__(self, clock: Scheduler = scheduler) -> None:
+        super().__init__()
+        self._clock = clock
+        self._silhouettes = WeakKeyDictionary()
+        self._free = []
+        self.allocated = 0
+
+    def silhouette(self, surface):
+        """White silhouette of surface's opaque pixels, on a black colorkey."""
+        silhouette = self._silhouettes.get(surface)
+        if silhouette is None:
+            silhouette = pygame.mask.from_surface(surface).to_surface()
+            silhouette.set_colorkey((0, 0, 0))
+            self._silhouettes[surface] = silhouette
+        return silhouette
+
+    def emit(self, pos, surface, groups, z=settings.LAYERS['main'], duration=200):
+        """Flashes the silhouette of surface at pos for duration ms of game time."""
+        self.emit_batch(((pos, surface),), groups, z, duration)
+
+    def emit_batch(self, emissions, groups, z=settings.LAYERS['main'], duration=200):
+        """Flashes a silhouette for every (pos, surface), sharing one expiry for the whole batch."""
+        batch = []
+        for pos, surface in emissions:
+            particle = self._free.pop() if self._free else self._allocate()
+            particle.image = self.silhouette(surface)
+            particle.rect.update(pos, particle.image.get_size())
+            particle.z = z
+            batch.append(particle)
+        for group in groups:
+            group.add(*batch)
+        self._clock.schedule(duration, partial(self._release, batch))
+        return batch
+
+    def _allocate(self):
+        self.allocated += 1
+        return Particle()
+
+    def _release(self, batch):
+        for particle in batch:
+            particle.kill()
+            particle.image = None
+        self._free.extend(batch)
+
+
+effects = Effects()
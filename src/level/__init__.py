@@ -1,2 +1,2 @@
-from .sky import Rain
+from .sky import Rain, Sky
 from .level import Level
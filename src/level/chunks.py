@@ -0,0 +1,45 @@
+import pygame
+
+from src import settings
+from src.sprites import Generic
+
+
+class ChunkBaker:
+    """Bakes the static tiles of one layer into fixed-size chunk surfaces, drawn as a handful of sprites.
+
+    The tiles are kept, so build() can bake them again after the chunk sprites were killed.
+    """
+
+    def __init__(self, z, chunk_size=settings.CHUNK_SIZE) -> None:
+        super().__init__()
+        self.z = z
+        self.chunk_size = chunk_size
+        self._tiles = []
+
+    def add(self, pos, surface):
+        self._tiles.append((surface.get_rect(topleft=pos), surface))
+
+    def build(self, groups):
+        # blit in the same y order the camera would have drawn the individual tiles
+        self._tiles.sort(key=lambda tile: tile[0].centery)
+
+        chunks = {}
+        for rect, surface in self._tiles:
+            for chunk_x in range(rect.left // self.chunk_size, (rect.right - 1) // self.chunk_size + 1):
+                for chunk_y in range(rect.top // self.chunk_size, (rect.bottom - 1) // self.chunk_size + 1):
+                    chunk_surface = chunks.get((chunk_x, chunk_y))
+                    if chunk_surface is None:
+                        chunk_surface = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA)
+                        chunks[(chunk_x, chunk_y)] = chunk_surface
+                    chunk_surface.blit(surface, (rect.x - chunk_x * self.chunk_size,
+                                                 rect.y - chunk_y * self.chunk_size))
+
+        sprites = []
+        for (chunk_x, chunk_y), chunk_surface in chunks.items():
+            chunk = Generic(pos=(chunk_x * self.chunk_size, chunk_y * self.chunk_size),
+                            surface=chunk_surface.convert_alpha(),
+                            groups=groups,
+                            z=self.z)
+            chunk.hitbox = None
+            sprites.append(chunk)
+        return sprites
@@ -1,123 +1,268 @@
+from bisect import insort
+from itertools import count
 from typing import Optional
 
 import pygame
-from pytmx.util_pygame import load_pygame
 
 from src import settings
-from src.level import Rain
+from src.animation import clip_registry
+from src.level import Rain, Sky
+from src.level.chunks import ChunkBaker
 from src.level.soil import SoilLayer
+from src.level.streaming import WorldStreamer
 from src.level.transition import DayTransition
 from src.overlay import Overlay
 from src.player import Player, PlayerInventoryManager
+from src.profiler import profiler
+from src.spatial import SpatialHash
+from src.timer import scheduler
 from src.sprites import Generic, Water, LevelSpriteFactory, WildFlower, Tree, Interaction
+from src.support import game_tile_pos_tuple, asset_cache
 
 
 class Level:
-    def __init__(self, player_inventory_manager: PlayerInventoryManager):
+    def __init__(self, player_inventory_manager: PlayerInventoryManager, controls=None, seed=None):
         self._player_inventory_manager = player_inventory_manager
+        self._controls = controls
         # get the display surface
         self.display_surface = pygame.display.get_surface()
 
         # sprite groups
         self.all_sprites = CameraGroup()
-        self.collision_sprites = pygame.sprite.Group()
+        self.collision_sprites = CollisionGroup()
         self.tree_sprites = pygame.sprite.Group()
         self.interaction_sprites = pygame.sprite.Group()
 
-        self.rain = Rain(self.all_sprites)
+        self.rain = Rain(self.all_sprites, seed=seed)
         self.raining = True
+        self.sky = Sky()
 
         self.player: Optional[Player] = None
         self.transition = None
         self.overlay = None
+        self.dirty_rects = None
         self._bed = None
         self.soil_layer = SoilLayer(self.all_sprites)
+        self.world = WorldStreamer()
+        self.world.area_listeners.append(self.soil_layer)
         self.setup()
 
     def setup(self):
-        layers = {
-            'HouseFloor': {'layer': 'house bottom', 'class': Generic},
-            'HouseFurnitureBottom': {'layer': 'house bottom', 'class': Generic},
-            'HouseWalls': {'layer': 'main', 'class': Generic},
-            'HouseFurnitureTop': {'layer': 'main', 'class': Generic},
-            'Fence': {'layer': 'main', 'class': Generic, 'collision': True},
-            'Water': {'layer': 'water', 'class': Water},
-            'Decoration': {'type': 'object', 'layer': 'main', 'class': WildFlower, 'collision': True},
-            'Trees': {'type': 'object', 'layer': 'main', 'class': Tree, 'collision': True},
-            'Collision': {'layer': 'main', 'class': Generic, 'collision': True, 'collision_only': True},
-        }
-
-        tmx_data = load_pygame('../data/map.tmx')
-
-        for tmx_layer, layer_info in layers.items():
-            sprite_group = []
-            if not layer_info.get('collision_only'):
-                sprite_group.append(self.all_sprites)
-            if layer_info.get('collision'):
-                sprite_group.append(self.collision_sprites)
-            if layer_info.get('type') == 'object':
-                for obj in tmx_data.get_layer_by_name(tmx_layer):
-                    sprite = LevelSpriteFactory.create(layer_info.get('class'),
-                                                       obj.x,
-                                                       obj.y,
-                                                       obj.image,
-                                                       sprite_group,
-                                                       settings.LAYERS[layer_info.get('layer')],
-                                                       name=obj.name,
-                                                       player_inventory_manager=self._player_inventory_manager)
-
-                    if tmx_layer == 'Trees':
-                        self.tree_sprites.add(sprite)
-            else:
-                for x, y, surface in tmx_data.get_layer_by_name(tmx_layer).tiles():
-                    LevelSpriteFactory.create(layer_info.get('class'), x, y, surface, sprite_group,
-                                              settings.LAYERS[layer_info.get('layer')], )
+        tilemap = asset_cache.tilemap('../data/map.tmx')
+        self.add_map_objects(tilemap)
 
-        for obj in tmx_data.get_layer_by_name('Player'):
+        for obj in tilemap.get_layer_by_name('Player'):
             if obj.name == 'Start':
+                # materialize the start area first, so the player draws over tiles like before streaming
+                self.world.update((obj.x, obj.y))
                 self.player = Player(
                     pos=(obj.x, obj.y),
                     all_sprites=self.all_sprites,
                     collision_group=self.collision_sprites,
                     interaction_group=self.interaction_sprites,
                     trees_group=self.tree_sprites,
-                    soil_layer=self.soil_layer)
+                    soil_layer=self.soil_layer,
+                    controls=self._controls)
                 self._player_inventory_manager.add_player(self.player)
             elif obj.name == 'Bed':
                 self._bed = Interaction((obj.x, obj.y),
                                         (obj.width, obj.height),
                                         groups=(self.interaction_sprites,),
                                         name='Bed',
-                                        transition=DayTransition(self.reset, self.player))
+                                        transition=DayTransition(self.reset, self.player, self.sky))
                 self.interaction_sprites.add(self._bed)
         self.overlay = Overlay(self.player)
 
         ground = Generic(pos=(0, 0),
-                         surface=pygame.image.load('../graphics/world/ground.png').convert_alpha(),
+                         surface=asset_cache.image('../graphics/world/ground.png'),
                          groups=(self.all_sprites,),
                          z=settings.LAYERS['ground'])
         ground.hitbox = None
+        self.world.update(self.player.rect.center)
+
+    def add_map_objects(self, tilemap, offset=(0, 0)):
+        """Registers the tiles and objects of the map with the world streamer, shifted by offset pixels."""
+        layers = {
+            'HouseFloor': {'layer': 'house bottom', 'class': Generic, 'bake': True},
+            'HouseFurnitureBottom': {'layer': 'house bottom', 'class': Generic, 'bake': True},
+            'HouseWalls': {'layer': 'main', 'class': Generic},
+            'HouseFurnitureTop': {'layer': 'main', 'class': Generic},
+            'Fence': {'layer': 'main', 'class': Generic, 'collision': True},
+            'Water': {'layer': 'water', 'class': Water},
+            'Decoration': {'type': 'object', 'layer': 'main', 'class': WildFlower, 'collision': True},
+            'Trees': {'type': 'object', 'layer': 'main', 'class': Tree, 'collision': True},
+            'Collision': {'collision_only': True},
+        }
+        offset_x, offset_y = offset
+        tile_offset_x, tile_offset_y = offset_x // settings.TILE_SIZE, offset_y // settings.TILE_SIZE
+        bakers = {}
+
+        for tmx_layer, layer_info in layers.items():
+            if layer_info.get('collision_only'):
+                self._add_collision_runs(tilemap.get_layer_by_name(tmx_layer), offset)
+                continue
+            sprite_group = [self.all_sprites]
+            if layer_info.get('collision'):
+                sprite_group.append(self.collision_sprites)
+            if tmx_layer == 'Trees':
+                sprite_group.append(self.tree_sprites)
+            z = settings.LAYERS[layer_info.get('layer')]
+            if layer_info.get('type') == 'object':
+                for obj in tilemap.get_layer_by_name(tmx_layer):
+                    pos = (obj.x + offset_x, obj.y + offset_y)
+                    self.world.add(pos, self._spawner(layer_info.get('class'), pos[0], pos[1], obj.image,
+                                                      sprite_group, z, name=obj.name,
+                                                      player_inventory_manager=self._player_inventory_manager))
+            elif layer_info.get('bake') and settings.BAKE_STATIC_LAYERS:
+                # baked tiles are only drawn through their chunk, collision keeps one hitbox per tile
+                hitbox_group = [group for group in sprite_group if group is not self.all_sprites]
+                for x, y, surface in tilemap.get_layer_by_name(tmx_layer).tiles():
+                    pos = game_tile_pos_tuple(x + tile_offset_x, y + tile_offset_y)
+                    chunk = (pos[0] // self.world.chunk_size, pos[1] // self.world.chunk_size)
+                    if (chunk, z) not in bakers:
+                        bakers[(chunk, z)] = ChunkBaker(z)
+                        self.world.add(pos, lambda state, baker=bakers[(chunk, z)]: baker.build((self.all_sprites,)))
+                    bakers[(chunk, z)].add(pos, surface)
+                    if hitbox_group:
+                        self.world.add(pos, self._spawner(layer_info.get('class'), x + tile_offset_x,
+                                                          y + tile_offset_y, surface, hitbox_group, z))
+            else:
+                for x, y, surface in tilemap.get_layer_by_name(tmx_layer).tiles():
+                    self.world.add(game_tile_pos_tuple(x + tile_offset_x, y + tile_offset_y),
+                                   self._spawner(layer_info.get('class'), x + tile_offset_x, y + tile_offset_y,
+                                                 surface, sprite_group, z))
+
+    def _add_collision_runs(self, tile_layer, offset):
+        # every run of tiles becomes one hitbox spanning the hitboxes its tiles would have had
+        tile = Generic.default_hitbox(pygame.Rect(0, 0, settings.TILE_SIZE, settings.TILE_SIZE))
+        hitboxes = []
+        for y, first_x, end_x in tile_layer.runs().tolist():
+            left = first_x * settings.TILE_SIZE + tile.left + offset[0]
+            right = (end_x - 1) * settings.TILE_SIZE + tile.right + offset[0]
+            hitboxes.append(pygame.Rect(left, y * settings.TILE_SIZE + tile.top + offset[1], right - left, tile.height))
+        self.collision_sprites.add_static(hitboxes)
+
+    @staticmethod
+    def _spawner(clazz, x, y, surface, groups, z, **kwargs):
+        return lambda state: [LevelSpriteFactory.create(clazz, x, y, surface, groups, z, state=state, **kwargs)]
 
     def reset(self):
+        """Rolls the world over to the next day, yielding between steps so it can be spread over frames."""
         tree: Tree
         for tree in self.tree_sprites.sprites():
             for apple in tree.apple_sprites.sprites():
                 apple.kill()
             tree.create_fruit()
+            yield
+        # trees that are not loaded grow new fruit when they are streamed back in
+        for state in self.world.saved_states():
+            state.pop('apples', None)
+        yield
 
+        self.soil_layer.grow()
+        yield
         self.soil_layer.remove_water()
+        self.sky.start_day()
 
     def run(self, dt):
-        self.display_surface.fill('black')
-        self.all_sprites.custom_draw(self.player)
-        self.all_sprites.update(dt)
-        if self.raining:
-            self.rain.update()
+        self.update(dt)
+        self.draw()
+
+    def update(self, dt):
+        """Advances the simulation by one tick of dt seconds."""
+        with profiler.scope('update'):
+            self.world.update(self.player.rect.center)
+            if self.raining:
+                self.soil_layer.water_all()
+            self.all_sprites.begin_tick()
+            clip_registry.tick(dt)
+            self.all_sprites.update(dt)
+            scheduler.advance(dt)
+        with profiler.scope('rain'):
+            self.rain.update(dt, spawn=self.raining)
+        self.sky.update(dt)
+
+        if self.player.sleep:
+            with profiler.scope('transition'):
+                self._bed.transition.update()
+
+    def draw(self, alpha=1.0, partial=True):
+        """Draws the world alpha of the way from the previous tick to the current one.
 
-        self.overlay.display()
+        With settings.DIRTY_RECTS and partial, dirty_rects is left with the screen rects that changed,
+        otherwise it is None and the whole screen needs updating.
+        """
+        with profiler.scope('draw'):
+            # a new tint changes every pixel
+            dirty = settings.DIRTY_RECTS and partial and not self.sky.changed
+            self.dirty_rects = self.all_sprites.custom_draw(self.player, alpha,
+                                                            self.overlay.rects() if dirty else None)
 
+        # the sleep fade darkens the overlay too, the day/night tint only the world
+        with profiler.scope('sky'):
+            if not self.player.sleep:
+                self.sky.draw(self.dirty_rects)
+        with profiler.scope('overlay'):
+            self.overlay.display()
         if self.player.sleep:
-            self._bed.transition.update()
+            with profiler.scope('sky'):
+                self.sky.draw(self.dirty_rects)
+
+
+class CollisionGroup(pygame.sprite.Group):
+    """Collision sprites with a uniform grid of their hitboxes, so movement only tests nearby hitboxes.
+
+    Static hitboxes without a sprite (the collision-only map layer) live in the same grid, keyed by
+    their index in static_hitboxes.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._grid = SpatialHash(settings.COLLISION_CELL_SIZE)
+        self._sprite_order = {}
+        self._sequence = count()
+        self._pending = {}
+        self.static_hitboxes = []
+
+    def add_static(self, hitboxes):
+        for hitbox in hitboxes:
+            index = len(self.static_hitboxes)
+            self.static_hitboxes.append(hitbox)
+            self._grid.insert(index, hitbox)
+            self._sprite_order[index] = next(self._sequence)
+
+    def add_internal(self, sprite, *args):
+        super().add_internal(sprite, *args)
+        # the hitbox is set by the sprite constructor after joining its groups
+        self._pending[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self._pending:
+            del self._pending[sprite]
+        elif sprite in self._grid:
+            self._grid.remove(sprite)
+            del self._sprite_order[sprite]
+
+    def relocate(self, sprite):
+        """Re-buckets a sprite after its hitbox changed, e.g. a tree becoming a stump."""
+        if sprite in self._grid:
+            self._grid.move(sprite, sprite.hitbox)
+
+    def _flush_pending(self):
+        for sprite in self._pending:
+            if getattr(sprite, 'hitbox', None) is not None:
+                self._grid.insert(sprite, sprite.hitbox)
+                self._sprite_order[sprite] = next(self._sequence)
+        self._pending.clear()
+
+    def hitboxes_near(self, rect):
+        """Hitboxes sharing a grid cell with rect, in the order the sprites joined the group."""
+        if self._pending:
+            self._flush_pending()
+        nearby = sorted(self._grid.query(rect), key=self._sprite_order.__getitem__)
+        static_hitboxes = self.static_hitboxes
+        return [static_hitboxes[item] if type(item) is int else item.hitbox for item in nearby]
 
 
 class CameraGroup(pygame.sprite.Group):
@@ -127,30 +272,253 @@ class CameraGroup(pygame.sprite.Group):
         self.display_surface = pygame.display.get_surface()
         self.offset = pygame.math.Vector2()
 
-    def custom_draw(self, player):
-        self.offset.x = player.rect.centerx - settings.SCREEN_WIDTH / 2
-        self.offset.y = player.rect.centery - settings.SCREEN_HEIGHT / 2
-        for layer in settings.LAYERS.values():
-            sprite: Generic
-            for sprite in sorted(self.sprites(), key=lambda _sprite: _sprite.rect.centery):
-                if sprite.z == layer:
-                    sprite_offset_rect = sprite.rect.copy()
-                    sprite_offset_rect.center -= self.offset
-                    self.display_surface.blit(sprite.image, sprite_offset_rect)
-
-                    if settings.DEBUG:
-                        # print collision boxes
-                        if getattr(sprite, 'hitbox', None) is not None:
-                            pygame.draw.rect(self.display_surface, 'red', sprite_offset_rect, 5)
-                            hitbox_rect = sprite.hitbox.copy()
-                            hitbox_rect.center = sprite_offset_rect.center
-                            pygame.draw.rect(self.display_surface, 'green', hitbox_rect, 5)
-
-                        if sprite == player:
-                            pygame.draw.rect(self.display_surface, 'red', sprite_offset_rect, 5)
-                            hitbox_rect = player.hitbox.copy()
-                            hitbox_rect.center = sprite_offset_rect.center
-                            pygame.draw.rect(self.display_surface, 'green', hitbox_rect, 5)
-                            target_pos = sprite_offset_rect.center + settings.PLAYER_TOOL_OFFSET[
-                                player.status.split("_")[0]]
-                            pygame.draw.circle(self.display_surface, 'blue', target_pos, 2)
+        self._viewport = pygame.Rect(0, 0, settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT)
+
+        # render queue: sprites of each layer kept in draw order, sorted only when the layer's membership
+        # changes (DYNAMIC_LAYERS every frame), and one spatial hash per layer to cull them to the viewport.
+        # sprites join before their subclass sets z, so new ones wait in _pending until the next draw
+        self._draw_order = sorted(settings.LAYERS.values())
+        self._layers = {layer: SpatialHash(settings.SPATIAL_CELL_SIZE) for layer in self._draw_order}
+        self._queues = {layer: [] for layer in self._draw_order}
+        self._stale_layers = set()
+        self._sprite_layers = {}
+        self._sprite_order = {}
+        self._sequence = count()
+        self._moving = {}
+        self._pending = {}
+        self._layer_renderers = {}
+        self._updating = {}
+        self._previous_centers = {}
+        self._last_frame = None
+
+    def add_internal(self, sprite, *args):
+        super().add_internal(sprite, *args)
+        self._pending[sprite] = None
+        # sprites without their own update (tiles, water, apples) are skipped by update()
+        if type(sprite).update is not pygame.sprite.Sprite.update:
+            self._updating[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self._pending:
+            del self._pending[sprite]
+        else:
+            layer = self._sprite_layers.pop(sprite)
+            self._layers[layer].remove(sprite)
+            self._stale_layers.add(layer)
+            del self._sprite_order[sprite]
+            self._moving.pop(sprite, None)
+            self._previous_centers.pop(sprite, None)
+        self._updating.pop(sprite, None)
+
+    def update(self, *args, **kwargs):
+        for sprite in list(self._updating):
+            sprite.update(*args, **kwargs)
+
+    def layer_counts(self):
+        """Bucketed sprites per layer name."""
+        layer_names = {layer: name for name, layer in settings.LAYERS.items()}
+        return {layer_names.get(layer, str(layer)): len(sprites) for layer, sprites in self._layers.items()}
+
+    def add_layer_renderer(self, layer, draw, bounds=None):
+        """Registers non-sprite content drawn after the sprites of a layer.
+
+        draw(surface, viewport, alpha, area) draws it, limited to the screen rect area when one is given.
+        bounds(viewport, alpha) returns the screen rects it covers, needed for dirty-rect rendering.
+        """
+        self._layer_renderers.setdefault(layer, []).append((draw, bounds))
+
+    def relocate(self, sprite):
+        """Re-buckets a sprite whose rect changed outside the moving sprites tracked every frame."""
+        if sprite in self._sprite_layers:
+            layer = self._sprite_layers[sprite]
+            self._layers[layer].move(sprite, sprite.rect)
+            self._stale_layers.add(layer)
+
+    def _flush_pending(self):
+        for sprite in self._pending:
+            if sprite.z not in self._layers:
+                self._layers[sprite.z] = SpatialHash(settings.SPATIAL_CELL_SIZE)
+                self._queues[sprite.z] = []
+                self._draw_order = sorted(self._layers)
+            self._layers[sprite.z].insert(sprite, sprite.rect)
+            self._stale_layers.add(sprite.z)
+            self._sprite_layers[sprite] = sprite.z
+            self._sprite_order[sprite] = next(self._sequence)
+            if getattr(sprite, 'dynamic', False):
+                self._moving[sprite] = None
+        self._pending.clear()
+
+    def _draw_key(self, sprite):
+        return sprite.rect.centery, self._sprite_order[sprite]
+
+    def _layer_queue(self, layer):
+        queue = self._queues[layer]
+        if layer in self._stale_layers:
+            self._stale_layers.discard(layer)
+            queue[:] = self._layers[layer].items()
+            queue.sort(key=self._draw_key)
+        elif layer in settings.DYNAMIC_LAYERS:
+            # other sprites only change place through a membership change or relocate(), which mark the layer stale
+            for sprite in self._moving:
+                if self._sprite_layers[sprite] == layer:
+                    queue.remove(sprite)
+                    insort(queue, sprite, key=self._draw_key)
+        return queue
+
+    def begin_tick(self):
+        """Remembers where the moving sprites are before a simulation tick, to interpolate their drawing."""
+        self._previous_centers = {sprite: sprite.rect.center for sprite in self._moving}
+
+    def _interpolation_shifts(self, alpha):
+        if alpha >= 1:
+            return {}
+        shifts = {}
+        for sprite, (previous_x, previous_y) in self._previous_centers.items():
+            center_x, center_y = sprite.rect.center
+            if previous_x != center_x or previous_y != center_y:
+                shifts[sprite] = (round((previous_x - center_x) * (1 - alpha)),
+                                  round((previous_y - center_y) * (1 - alpha)))
+        return shifts
+
+    def custom_draw(self, player, alpha=1.0, dirty_rects=None):
+        """Draws the visible sprites, clearing the screen first.
+
+        With dirty_rects (a list of extra screen rects to repaint, possibly empty) and a camera that didn't
+        move since the last frame, only the areas that changed are repainted. Returns the repainted screen
+        rects for display.update(), or None when the whole screen was redrawn.
+        """
+        shifts = self._interpolation_shifts(alpha)
+        player_shift_x, player_shift_y = shifts.get(player, (0, 0))
+        self.offset.x = player.rect.centerx + player_shift_x - settings.SCREEN_WIDTH / 2
+        self.offset.y = player.rect.centery + player_shift_y - settings.SCREEN_HEIGHT / 2
+        offset_x, offset_y = int(self.offset.x), int(self.offset.y)
+        camera_moved = self._viewport.topleft != (offset_x, offset_y)
+        self._viewport.topleft = (offset_x, offset_y)
+        if self._pending:
+            self._flush_pending()
+        for sprite in self._moving:
+            self._layers[self._sprite_layers[sprite]].move(sprite, sprite.rect)
+
+        visible_layers = []
+        for layer in self._draw_order:
+            # streaming keeps layers small, so filtering the sorted queue beats sorting the visible sprites
+            candidates = self._layers[layer].query(self._viewport)
+            visible_layers.append((layer, [sprite for sprite in self._layer_queue(layer) if sprite in candidates]))
+
+        if dirty_rects is None:
+            self._last_frame = None
+        else:
+            repaint = self._changed_rects(visible_layers, shifts, alpha, camera_moved, dirty_rects)
+            if repaint is not None:
+                for rect in repaint:
+                    self._repaint(rect, shifts, alpha)
+                return repaint
+
+        self.display_surface.fill('black')
+        for layer, visible in visible_layers:
+            self._draw_layer(layer, visible, shifts, alpha)
+            if settings.DEBUG:
+                self._draw_debug(visible, player)
+        return None
+
+    def _draw_layer(self, layer, sprites, shifts, alpha, area=None):
+        offset_x, offset_y = self._viewport.topleft
+        if shifts:
+            self.display_surface.blits([(sprite.image, self._shifted_position(sprite, shifts, offset_x, offset_y))
+                                        for sprite in sprites], doreturn=False)
+        else:
+            self.display_surface.blits([(sprite.image, (sprite.rect.x - offset_x, sprite.rect.y - offset_y))
+                                        for sprite in sprites], doreturn=False)
+        for draw, _ in self._layer_renderers.get(layer, ()):
+            draw(self.display_surface, self._viewport, alpha, area)
+
+    def _changed_rects(self, visible_layers, shifts, alpha, camera_moved, extra_rects):
+        """Screen rects that changed since the last frame, or None when a full redraw is due."""
+        offset_x, offset_y = self._viewport.topleft
+        frame = {}
+        for _, visible in visible_layers:
+            for sprite in visible:
+                shift_x, shift_y = shifts.get(sprite, (0, 0))
+                frame[sprite] = (sprite.image, sprite.rect.x + shift_x - offset_x, sprite.rect.y + shift_y - offset_y)
+        renderer_rects = []
+        for renderers in self._layer_renderers.values():
+            for _, bounds in renderers:
+                if bounds is None:
+                    # content we can't track, so it can't be drawn partially
+                    renderer_rects = None
+                    break
+                renderer_rects.extend(bounds(self._viewport, alpha))
+            if renderer_rects is None:
+                break
+
+        last_frame, last_renderer_rects = self._last_frame or (None, None)
+        self._last_frame = (frame, renderer_rects)
+        if last_frame is None or camera_moved or renderer_rects is None or settings.DEBUG:
+            return None
+
+        changed = list(extra_rects) + renderer_rects + last_renderer_rects
+        for sprite, entry in frame.items():
+            last_entry = last_frame.get(sprite)
+            if last_entry != entry:
+                changed.append(pygame.Rect(entry[1:], entry[0].get_size()))
+                if last_entry is not None:
+                    changed.append(pygame.Rect(last_entry[1:], last_entry[0].get_size()))
+        for sprite, last_entry in last_frame.items():
+            if sprite not in frame:
+                changed.append(pygame.Rect(last_entry[1:], last_entry[0].get_size()))
+
+        screen = self.display_surface.get_rect()
+        changed = _merge_rects([rect.clip(screen) for rect in changed if rect.colliderect(screen)])
+        if len(changed) > settings.DIRTY_RECTS_MAX or \
+                sum(rect.w * rect.h for rect in changed) > screen.w * screen.h * settings.DIRTY_AREA_MAX:
+            return None
+        return changed
+
+    def _repaint(self, rect, shifts, alpha):
+        world_rect = rect.move(self._viewport.topleft)
+        self.display_surface.set_clip(rect)
+        self.display_surface.fill('black', rect)
+        for layer in self._draw_order:
+            sprites = sorted(self._layers[layer].query(world_rect), key=self._draw_key)
+            self._draw_layer(layer, sprites, shifts, alpha, rect)
+        self.display_surface.set_clip(None)
+
+    @staticmethod
+    def _shifted_position(sprite, shifts, offset_x, offset_y):
+        shift_x, shift_y = shifts.get(sprite, (0, 0))
+        return sprite.rect.x + shift_x - offset_x, sprite.rect.y + shift_y - offset_y
+
+    def _draw_debug(self, sprites, player):
+        sprite: Generic
+        for sprite in sprites:
+            sprite_offset_rect = sprite.rect.copy()
+            sprite_offset_rect.center -= self.offset
+
+            # print collision boxes
+            if getattr(sprite, 'hitbox', None) is not None:
+                pygame.draw.rect(self.display_surface, 'red', sprite_offset_rect, 5)
+                hitbox_rect = sprite.hitbox.copy()
+                hitbox_rect.center = sprite_offset_rect.center
+                pygame.draw.rect(self.display_surface, 'green', hitbox_rect, 5)
+
+            if sprite == player:
+                pygame.draw.rect(self.display_surface, 'red', sprite_offset_rect, 5)
+                hitbox_rect = player.hitbox.copy()
+                hitbox_rect.center = sprite_offset_rect.center
+                pygame.draw.rect(self.display_surface, 'green', hitbox_rect, 5)
+                target_pos = sprite_offset_rect.center + settings.PLAYER_TOOL_OFFSET[
+                    player.status.split("_")[0]]
+                pygame.draw.circle(self.display_surface, 'blue', target_pos, 2)
+
+
+def _merge_rects(rects):
+    """Unions overlapping rects until none overlap."""
+    merged = []
+    for rect in rects:
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
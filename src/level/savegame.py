@@ -0,0 +1,214 @@
+import hashlib
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src import settings
+from src.timer import Scheduler, scheduler
+
+# file layout: header, player and sky state, inventory records, soil and plant arrays, tree records
+SAVE_MAGIC = b'PVSV'
+SAVE_VERSION = 1
+HEADER = struct.Struct('<4sHI')
+WORLD_STATE = struct.Struct('<fii?BB')
+INVENTORY_COUNT = struct.Struct('<B')
+INVENTORY_ITEM = struct.Struct('<B16sI')
+GRID_SHAPE = struct.Struct('<HH')
+TREE_COUNT = struct.Struct('<I')
+TREE = struct.Struct('<IbBH')
+APPLE = struct.Struct('<ii')
+# apple count of a tree that grows new fruit when it is loaded
+REGROW_APPLES = 0xFFFF
+
+
+class SaveSnapshot:
+    """Copy of the world state taken on the main thread, safe to encode and write on another thread."""
+
+    def __init__(self, object_count, time, player_pos, raining, tool_index, seed_index, inventory,
+                 grid, plant_type, plant_age, trees) -> None:
+        super().__init__()
+        self.object_count = object_count
+        self.time = time
+        self.player_pos = player_pos
+        self.raining = raining
+        self.tool_index = tool_index
+        self.seed_index = seed_index
+        self.inventory = inventory
+        self.grid = grid
+        self.plant_type = plant_type
+        self.plant_age = plant_age
+        self.trees = trees
+
+    @classmethod
+    def take(cls, level):
+        soil_layer = level.soil_layer
+        player = level.player
+        return cls(len(level.world), level.sky.time, player.rect.center, level.raining,
+                   player.tool_index, player.seed_index, dict(player.item_inventory),
+                   soil_layer.grid.copy(), soil_layer.plant_type.copy(), soil_layer.plant_age.copy(),
+                   level.world.states())
+
+    def apply(self, level):
+        """Puts the level in the saved state; it must have been built from the same map."""
+        if self.object_count != len(level.world):
+            raise ValueError(f'save is for a map with {self.object_count} objects, not {len(level.world)}')
+        if self.grid.shape != level.soil_layer.grid.shape:
+            raise ValueError(f'save is for a {self.grid.shape} soil grid, not {level.soil_layer.grid.shape}')
+
+        soil_layer = level.soil_layer
+        level.world.unload_all()
+        soil_layer.grid = self.grid
+        soil_layer.plant_type = self.plant_type
+        soil_layer.plant_age = self.plant_age
+        level.world.restore_states(self.trees)
+
+        player = level.player
+        player.place(self.player_pos)
+        player.tool_index = self.tool_index
+        player.selected_tool = player.tools[self.tool_index]
+        player.seed_index = self.seed_index
+        player.selected_seed = player.seeds[self.seed_index]
+        player.item_inventory.update(self.inventory)
+        level.raining = self.raining
+        level.sky.time = self.time
+        level.sky.update(0)
+        level.world.update(player.rect.center)
+
+    def encode(self):
+        chunks = [HEADER.pack(SAVE_MAGIC, SAVE_VERSION, self.object_count),
+                  WORLD_STATE.pack(self.time, *self.player_pos, self.raining, self.tool_index, self.seed_index),
+                  INVENTORY_COUNT.pack(len(self.inventory))]
+        for name, quantity in self.inventory.items():
+            encoded = name.encode()
+            chunks.append(INVENTORY_ITEM.pack(len(encoded), encoded, quantity))
+
+        chunks.append(GRID_SHAPE.pack(*self.grid.shape))
+        chunks += [self.grid.astype('u1').tobytes(), self.plant_type.astype('u1').tobytes(),
+                   self.plant_age.astype('<f4').tobytes()]
+
+        chunks.append(TREE_COUNT.pack(len(self.trees)))
+        for key, state in self.trees.items():
+            apples = state.get('apples')
+            chunks.append(TREE.pack(key, state['health'], state['alive'],
+                                    REGROW_APPLES if apples is None else len(apples)))
+            chunks += [APPLE.pack(*pos) for pos in apples or ()]
+        return b''.join(chunks)
+
+    def digest(self):
+        """SHA-1 of the encoded state, equal for two worlds that would save the same."""
+        return hashlib.sha1(self.encode()).digest()
+
+    @classmethod
+    def decode(cls, data):
+        magic, version, object_count = HEADER.unpack_from(data)
+        if magic != SAVE_MAGIC or version != SAVE_VERSION:
+            raise ValueError(f'not a version {SAVE_VERSION} save')
+        offset = HEADER.size
+        time, x, y, raining, tool_index, seed_index = WORLD_STATE.unpack_from(data, offset)
+        offset += WORLD_STATE.size
+
+        inventory = {}
+        count, = INVENTORY_COUNT.unpack_from(data, offset)
+        offset += INVENTORY_COUNT.size
+        for _ in range(count):
+            name_length, name, quantity = INVENTORY_ITEM.unpack_from(data, offset)
+            inventory[name[:name_length].decode()] = quantity
+            offset += INVENTORY_ITEM.size
+
+        rows, cols = GRID_SHAPE.unpack_from(data, offset)
+        offset += GRID_SHAPE.size
+        arrays = []
+        for stored, dtype in (('u1', np.uint8), ('u1', np.uint8), ('<f4', np.float32)):
+            array = np.frombuffer(data, dtype=stored, count=rows * cols, offset=offset)
+            arrays.append(array.reshape(rows, cols).astype(dtype))
+            offset += array.nbytes
+
+        trees = {}
+        count, = TREE_COUNT.unpack_from(data, offset)
+        offset += TREE_COUNT.size
+        for _ in range(count):
+            key, health, alive, apple_count = TREE.unpack_from(data, offset)
+            offset += TREE.size
+            state = {'health': health, 'alive': bool(alive)}
+            if apple_count != REGROW_APPLES:
+                state['apples'] = [APPLE.unpack_from(data, offset + index * APPLE.size)
+                                   for index in range(apple_count)]
+                offset += apple_count * APPLE.size
+            trees[key] = state
+
+        grid, plant_type, plant_age = arrays
+        return cls(object_count, time, (x, y), raining, tool_index, seed_index, inventory,
+                   grid, plant_type, plant_age, trees)
+
+
+def write_save(path, snapshot: SaveSnapshot):
+    """Encodes and atomically writes a snapshot, so a crash mid-write keeps the previous save."""
+    data = snapshot.encode()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as save_file:
+        save_file.write(data)
+    os.replace(temporary_path, path)
+
+
+def read_save(path):
+    """Snapshot stored at path; raises ValueError when it is not a readable save of this version."""
+    with open(path, 'rb') as save_file:
+        data = save_file.read()
+    try:
+        return SaveSnapshot.decode(data)
+    except struct.error as error:
+        raise ValueError(f'truncated save: {error}') from error
+
+
+class Autosaver:
+    """Saves the level every interval seconds of game time.
+
+    The snapshot is taken on the main thread, encoding and writing happen on a background thread;
+    a save is skipped while the previous one is still being written.
+    """
+
+    def __init__(self, level, path=settings.SAVE_PATH, interval=settings.AUTOSAVE_INTERVAL,
+                 clock: Scheduler = scheduler) -> None:
+        super().__init__()
+        self.level = level
+        self.path = path
+        self.interval = interval
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+        self._entry = None
+
+    def start(self):
+        self._entry = self._clock.schedule(self.interval * 1000, self._autosave)
+
+    def _autosave(self):
+        self.save()
+        self.start()
+
+    def save(self):
+        if self._pending is not None and not self._pending.done():
+            return
+        self._pending = self._executor.submit(write_save, self.path, SaveSnapshot.take(self.level))
+        self._pending.add_done_callback(self._report)
+
+    def _report(self, future):
+        # errors would otherwise stay inside the future
+        error = future.exception()
+        if error is not None:
+            print(f'could not save {self.path}: {error}')
+
+    def close(self):
+        """Stops autosaving, waits for a save being written and saves one last time."""
+        if self._entry is not None:
+            self._clock.cancel(self._entry)
+            self._entry = None
+        self._executor.shutdown(wait=True)
+        try:
+            write_save(self.path, SaveSnapshot.take(self.level))
+        except (OSError, struct.error) as error:
+            print(f'could not save {self.path}: {error}')
@@ -1,58 +1,171 @@
-from random import randint, choice
-
-import pygame.image
+import numpy as np
+import pygame
 
 from src import settings
-from src.sprites import Generic
-from src.support import import_folder
+from src.support import asset_cache
+
 
+class RainPool:
+    """Fixed-capacity particle pool, one row per particle in NumPy arrays."""
+
+    def __init__(self, frames, capacity, rng) -> None:
+        super().__init__()
+        self.frames = frames
+        self._rng = rng
+        self._margin = max(max(frame.get_size()) for frame in frames)
 
-class Drop(Generic):
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.float32)
+        self.frame = np.zeros(capacity, dtype=np.uint8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self._last_dt = 0.0
 
-    def __init__(self, pos, surface, moving, groups, z=settings.LAYERS['rain drops']) -> None:
-        super().__init__(pos, surface, groups, z)
-        self.lifetime = randint(400, 500)
-        self.start_time = pygame.time.get_ticks()
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
 
-        self.moving = moving
-        if moving:
-            self.pos = pygame.math.Vector2(self.rect.topleft)
-            self.direction = pygame.math.Vector2(-2, 4)
-            self.speed = randint(200, 250)
+    def spawn(self, count, area, velocity=None):
+        """Spawns up to count particles inside area (w, h); extra particles are dropped when the pool is full."""
+        slots = np.flatnonzero(~self.alive)[:count]
+        count = len(slots)
+        if count == 0:
+            return
+
+        rng = self._rng
+        self.pos[slots, 0] = rng.integers(0, area[0], count, endpoint=True)
+        self.pos[slots, 1] = rng.integers(0, area[1], count, endpoint=True)
+        self.velocity[slots] = 0 if velocity is None else velocity(count)
+        self.age[slots] = 0
+        self.lifetime[slots] = rng.integers(400, 500, count, endpoint=True) / 1000
+        self.frame[slots] = rng.integers(0, len(self.frames), count)
+        self.alive[slots] = True
 
     def update(self, dt):
-        if self.moving:
-            self.pos += self.direction * self.speed * dt
-            self.rect.topleft = (round(self.pos.x), round(self.pos.y))
-        if pygame.time.get_ticks() - self.start_time >= self.lifetime:
-            self.kill()
+        self._last_dt = dt
+        self.pos += self.velocity * dt
+        self.age += dt
+        self.alive &= self.age < self.lifetime
+
+    def _visible(self, viewport, alpha, area=None):
+        """Frame indices and screen positions of the particles on screen (or overlapping area)."""
+        pos = self.pos
+        if alpha < 1:
+            # step back along the velocity to where the particle was alpha of the way through the last tick
+            pos = pos - self.velocity * ((1 - alpha) * self._last_dt)
+        x = np.rint(pos[:, 0]).astype(np.int32) - viewport.left
+        y = np.rint(pos[:, 1]).astype(np.int32) - viewport.top
+        left, top, right, bottom = (0, 0, viewport.width, viewport.height) if area is None else \
+            (area.left, area.top, area.right, area.bottom)
+        visible = np.flatnonzero(self.alive
+                                 & (x > left - self._margin) & (x < right)
+                                 & (y > top - self._margin) & (y < bottom))
+        return self.frame[visible].tolist(), x[visible].tolist(), y[visible].tolist()
+
+    def draw(self, surface, viewport, alpha=1.0, area=None):
+        frames = self.frames
+        surface.blits([(frames[frame], (left, top))
+                       for frame, left, top in zip(*self._visible(viewport, alpha, area))], doreturn=False)
+
+    def screen_rects(self, viewport, alpha=1.0):
+        frames = self.frames
+        return [frames[frame].get_rect(topleft=(left, top))
+                for frame, left, top in zip(*self._visible(viewport, alpha))]
 
 
 class Rain:
-    def __init__(self, all_sprites) -> None:
+    def __init__(self, all_sprites, seed=None, capacity=settings.RAIN_CAPACITY) -> None:
         super().__init__()
         self.all_sprites = all_sprites
-        self.rain_drops = import_folder('../graphics/rain/drops/')
-        self.rain_floor = import_folder('../graphics/rain/floor/')
-        self.floor_w, self.floor_h = pygame.image.load('../graphics/world/ground.png').get_size()
-
-    def create_floor(self):
-        Drop(
-            surface=choice(self.rain_floor),
-            pos=(randint(0, self.floor_w), randint(0, self.floor_h)),
-            moving=False,
-            groups=(self.all_sprites,)
-        )
-
-    def create_drops(self):
-        Drop(
-            surface=choice(self.rain_drops),
-            pos=(randint(0, self.floor_w), randint(0, self.floor_h)),
-            moving=True,
-            groups=(self.all_sprites,),
-            z=settings.LAYERS['rain drops']
-        )
-
-    def update(self):
-        self.create_floor()
-        self.create_drops()
+        self.floor_w, self.floor_h = asset_cache.image('../graphics/world/ground.png').get_size()
+
+        self._rng = np.random.default_rng(seed)
+        self._spawn_budget = 0.0
+        self.spawn_rate = settings.RAIN_SPAWN_RATE
+        self.drops = RainPool(asset_cache.folder('../graphics/rain/drops/'), capacity, self._rng)
+        self.floor = RainPool(asset_cache.folder('../graphics/rain/floor/'), capacity, self._rng)
+
+        all_sprites.add_layer_renderer(settings.LAYERS['rain floor'], self.floor.draw, self.floor.screen_rects)
+        all_sprites.add_layer_renderer(settings.LAYERS['rain drops'], self.drops.draw, self.drops.screen_rects)
+
+    def _drop_velocity(self, count):
+        speed = self._rng.integers(200, 250, count, endpoint=True).astype(np.float32)
+        return np.outer(speed, (-2, 4))
+
+    def update(self, dt, spawn=True):
+        self.floor.update(dt)
+        self.drops.update(dt)
+        if not spawn:
+            return
+
+        # spawn at a fixed rate per second so the cost doesn't scale with the frame rate
+        self._spawn_budget += self.spawn_rate * dt
+        count = int(self._spawn_budget)
+        self._spawn_budget -= count
+        area = (self.floor_w, self.floor_h)
+        self.floor.spawn(count, area)
+        self.drops.spawn(count, area, self._drop_velocity)
+
+
+def build_tint_lut(keyframes, size):
+    """size colors sampled evenly over the day from (time, color) keyframes, linearly interpolated."""
+    times = [time for time, _ in keyframes]
+    samples = np.arange(size) / size
+    channels = [np.rint(np.interp(samples, times, [color[channel] for _, color in keyframes])).astype(int)
+                for channel in range(3)]
+    return [tuple(color) for color in np.stack(channels, axis=1).tolist()]
+
+
+class Sky:
+    """Tints the world for the time of day and the sleep fade with a single multiply blend per frame.
+
+    The tint comes from a precomputed table and is kept in one reused screen-sized surface that is only
+    refilled when the color changes; blitting it is much cheaper than a blended fill. Full daylight costs
+    nothing.
+    """
+
+    def __init__(self, start_time=settings.DAY_START) -> None:
+        super().__init__()
+        self.display_surface = pygame.display.get_surface()
+        self._tint = pygame.Surface(self.display_surface.get_size()).convert()
+        self.day_length = settings.DAY_LENGTH
+        self.time = start_time
+        # sleep fade, 255 is no fade and 0 black
+        self.fade = 255
+        self.color = (255, 255, 255)
+        # whether the tint changed since the last draw, which then has to cover the whole screen
+        self.changed = True
+        self._lut = build_tint_lut(settings.SKY_COLORS, settings.SKY_LUT_SIZE)
+        self._refresh()
+
+    def start_day(self):
+        self.time = settings.DAY_START
+        self._refresh()
+
+    def update(self, dt):
+        self.time = (self.time + dt / self.day_length) % 1
+        self._refresh()
+
+    def _refresh(self):
+        red, green, blue = self._lut[int(self.time * len(self._lut)) % len(self._lut)]
+        if self.fade < 255:
+            red, green, blue = red * self.fade // 255, green * self.fade // 255, blue * self.fade // 255
+        if (red, green, blue) != self.color:
+            self.color = (red, green, blue)
+            self._tint.fill(self.color)
+            self.changed = True
+
+    def set_fade(self, fade):
+        self.fade = fade
+        self._refresh()
+
+    def draw(self, rects=None):
+        """Tints the whole screen, or only rects when just those were repainted."""
+        self.changed = False
+        if self.color == (255, 255, 255):
+            return
+        if rects is None:
+            self.display_surface.blit(self._tint, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+        else:
+            for rect in rects:
+                self.display_surface.blit(self._tint, rect, rect, special_flags=pygame.BLEND_RGB_MULT)
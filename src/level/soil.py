@@ -1,12 +1,28 @@
 from random import choice
 
+import numpy as np
 import pygame.sprite
-import pytmx
-from pygame import Rect
-from pygame.sprite import AbstractGroup
 
 from src import settings
-from src.support import import_folder_dict, import_folder
+from src.support import asset_cache
+
+# SoilLayer.grid cell flags
+FARMABLE = 1 << 0
+TILLED = 1 << 1
+WATERED = 1 << 2
+PLANTED = 1 << 3
+
+# autotiling: tilled neighbours as a 4-bit mask, indexing the soil surface to use
+NEIGHBOUR_TOP = 1 << 0
+NEIGHBOUR_BOTTOM = 1 << 1
+NEIGHBOUR_LEFT = 1 << 2
+NEIGHBOUR_RIGHT = 1 << 3
+SOIL_TILE_NAMES = ('o', 'b', 't', 'tb', 'r', 'br', 'tr', 'tbl', 'l', 'bl', 'tl', 'tbr', 'lr', 'lrb', 'lrt', 'x')
+
+# SoilLayer.plant_type values are 1 + the index of the crop, 0 is no plant
+CROPS = ('corn', 'tomato')
+# crops stand on their tile, a bit raised so they look rooted in the soil
+CROP_Y_OFFSET = {'corn': -16, 'tomato': -8}
 
 
 class SoilTile(pygame.sprite.Sprite):
@@ -27,108 +43,223 @@ class WaterTile(pygame.sprite.Sprite):
         self.z = settings.LAYERS['soil water']
 
 
+class PlantTile(pygame.sprite.Sprite):
+
+    def __init__(self, midbottom, surface, groups, z) -> None:
+        super().__init__(groups)
+        self.image = surface
+        self.rect = self.image.get_rect(midbottom=midbottom)
+        self.z = z
+
+
 class SoilLayer:
     def __init__(self, all_sprites) -> None:
         super().__init__()
         self.all_sprites = all_sprites
         self.soil_sprites = pygame.sprite.Group()
-        self.soil_surfaces = import_folder_dict('../graphics/soil/')
+        self.soil_tiles = {}
+        self.soil_surfaces = asset_cache.folder_dict('../graphics/soil/')
 
         self.water_sprites = pygame.sprite.Group()
-        self.water_surfaces = import_folder('../graphics/soil_water/')
+        self.water_tiles = {}
+        self.water_surfaces = asset_cache.folder('../graphics/soil_water/')
+
+        self.plant_sprites = pygame.sprite.Group()
+        self.plant_tiles = {}
+        # growth stage frames per plant type, in stage order
+        self.plant_frames = [None] + [[frames[str(stage)] for stage in range(len(frames))]
+                                      for frames in (asset_cache.folder_dict(f'../graphics/fruit/{crop}')
+                                                     for crop in CROPS)]
+        self._grow_speed = np.array([0] + [settings.GROW_SPEED[crop] for crop in CROPS], dtype=np.float32)
+        self._max_stage = np.array([0] + [len(frames) - 1 for frames in self.plant_frames[1:]], dtype=np.float32)
 
         self.grid = None
-        self.hit_rects = None
+        # plant state aligned with the grid: crop per tile and its age in growth stages
+        self.plant_type = None
+        self.plant_age = None
+        # tile ranges (left, top, right, bottom) that have sprites; None until streamed, then only loaded
+        # areas get sprites while the grid keeps the state of the whole farm
+        self._loaded_areas = None
         self.create_soil_grid()
-        self.create_hit_rects()
 
     def create_soil_grid(self):
-        ground = pygame.image.load('../graphics/world/ground.png')
-        farmable_tiles = pytmx.load_pygame('../data/map.tmx').get_layer_by_name('Farmable').tiles()
+        ground = asset_cache.image('../graphics/world/ground.png')
+        farmable = asset_cache.tilemap('../data/map.tmx').get_layer_by_name('Farmable').gids
         h_tiles = ground.get_width() // settings.TILE_SIZE
         v_tiles = ground.get_height() // settings.TILE_SIZE
-        self.grid = [[[] for col in range(h_tiles)] for row in range(v_tiles)]
+        # one byte of flags per tile, addressed as grid[y, x]
+        self.grid = np.zeros((v_tiles, h_tiles), dtype=np.uint8)
+        self.grid[np.nonzero(farmable)] |= FARMABLE
+        self.plant_type = np.zeros_like(self.grid)
+        self.plant_age = np.zeros(self.grid.shape, dtype=np.float32)
+
+    def tile_at(self, point):
+        """Grid (x, y) of the tile under a world position, or None outside the grid."""
+        x = int(point[0] // settings.TILE_SIZE)
+        y = int(point[1] // settings.TILE_SIZE)
+        if 0 <= y < self.grid.shape[0] and 0 <= x < self.grid.shape[1]:
+            return x, y
+        return None
 
-        for x, y, _ in farmable_tiles:
-            self.grid[y][x].append('F')
+    def _area_tiles(self, rect):
+        rows, cols = self.grid.shape
+        size = settings.TILE_SIZE
+        return (max(rect.left // size, 0), max(rect.top // size, 0),
+                min(-(-rect.right // size), cols), min(-(-rect.bottom // size), rows))
 
-    def create_hit_rects(self):
-        self.hit_rects = []
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'F' in cell:
-                    x = index_col * settings.TILE_SIZE
-                    y = index_row * settings.TILE_SIZE
-                    rect = pygame.Rect(x, y, settings.TILE_SIZE, settings.TILE_SIZE)
-                    self.hit_rects.append(rect)
+    def _is_loaded(self, x, y):
+        if self._loaded_areas is None:
+            return True
+        return any(left <= x < right and top <= y < bottom for left, top, right, bottom in self._loaded_areas)
+
+    def load_area(self, rect):
+        """Creates the soil and water sprites of the tiles inside the world rect."""
+        if self._loaded_areas is None:
+            self._loaded_areas = {}
+        left, top, right, bottom = area = self._area_tiles(rect)
+        self._loaded_areas[area] = None
+        for y, x in np.argwhere(self.grid[top:bottom, left:right] & TILLED).tolist():
+            self.update_soil_tile(left + x, top + y)
+        for y, x in np.argwhere(self.grid[top:bottom, left:right] & WATERED).tolist():
+            self._add_water_tile(left + x, top + y)
+        for y, x in np.argwhere(self.grid[top:bottom, left:right] & PLANTED).tolist():
+            self.update_plant_tile(left + x, top + y)
+
+    def unload_area(self, rect):
+        """Removes the sprites of the tiles inside the world rect, their state stays in the grid."""
+        left, top, right, bottom = area = self._area_tiles(rect)
+        if self._loaded_areas is not None:
+            self._loaded_areas.pop(area, None)
+        for tiles in (self.soil_tiles, self.water_tiles, self.plant_tiles):
+            for tile in [tile for tile in tiles if left <= tile[0] < right and top <= tile[1] < bottom]:
+                tiles.pop(tile).kill()
 
     def get_hit(self, point):
-        rect: Rect
-        for rect in self.hit_rects:
-            if rect.collidepoint(point):
-                x = rect.x // settings.TILE_SIZE
-                y = rect.y // settings.TILE_SIZE
+        tile = self.tile_at(point)
+        if tile is None:
+            return
 
-                if 'F' in self.grid[y][x]:
-                    self.grid[y][x].append('X')
-                    self.create_soil_tiles()
+        x, y = tile
+        if self.grid[y, x] & FARMABLE and not self.grid[y, x] & TILLED:
+            self.grid[y, x] |= TILLED
+            self.update_soil_tiles_around(x, y)
 
     def water(self, pos):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(pos):
-                # add entry to grid: W
-                x = soil_sprite.rect.x // settings.TILE_SIZE
-                y = soil_sprite.rect.y // settings.TILE_SIZE
-                self.grid[y][x].append('W')
-
-                # create water sprite
-                soil_pos = soil_sprite.rect.topleft
-                surface = choice(self.water_surfaces)
-                WaterTile(soil_pos, surface, (self.all_sprites, self.water_sprites,))
+        tile = self.tile_at(pos)
+        if tile is None:
+            return
+
+        x, y = tile
+        if self.grid[y, x] & TILLED and not self.grid[y, x] & WATERED:
+            self.grid[y, x] |= WATERED
+            self._add_water_tile(x, y)
+
+    def _add_water_tile(self, x, y):
+        if (x, y) in self.water_tiles or not self._is_loaded(x, y):
+            return
+        surface = choice(self.water_surfaces)
+        self.water_tiles[(x, y)] = WaterTile((x * settings.TILE_SIZE, y * settings.TILE_SIZE), surface,
+                                             (self.all_sprites, self.water_sprites,))
+
+    def water_all(self):
+        """Waters every tilled tile at once, e.g. while it rains."""
+        dry = (self.grid & (TILLED | WATERED)) == TILLED
+        if not dry.any():
+            return
+        self.grid[dry] |= WATERED
+        for y, x in np.argwhere(dry).tolist():
+            self._add_water_tile(x, y)
+
+    def plant_seed(self, point, seed):
+        tile = self.tile_at(point)
+        if tile is None:
+            return
+
+        x, y = tile
+        if self.grid[y, x] & TILLED and not self.grid[y, x] & PLANTED:
+            self.grid[y, x] |= PLANTED
+            self.plant_type[y, x] = CROPS.index(seed) + 1
+            self.plant_age[y, x] = 0
+            self.update_plant_tile(x, y)
+
+    def grow(self):
+        """Ages every watered plant by its crop's GROW_SPEED in one step, redrawing only the ones that
+        reached a new growth stage."""
+        growing = (self.grid & (PLANTED | WATERED)) == (PLANTED | WATERED)
+        stages = self.plant_age.astype(np.uint8)
+        np.add(self.plant_age, self._grow_speed[self.plant_type], out=self.plant_age, where=growing)
+        np.minimum(self.plant_age, self._max_stage[self.plant_type], out=self.plant_age)
+        changed = self.plant_age.astype(np.uint8) != stages
+        # only loaded plants have sprites, far fewer than the plants on a big farm
+        for x, y in [tile for tile in self.plant_tiles if changed[tile[1], tile[0]]]:
+            self.update_plant_tile(x, y)
+
+    def update_plant_tile(self, x, y):
+        if not self._is_loaded(x, y):
+            return
+
+        plant_type = self.plant_type[y, x]
+        stage = int(self.plant_age[y, x])
+        surface = self.plant_frames[plant_type][stage]
+        # seedlings lie flat on the ground, grown plants are y-sorted with the player
+        z = settings.LAYERS['ground plant'] if stage == 0 else settings.LAYERS['main']
+        midbottom = ((x + 0.5) * settings.TILE_SIZE,
+                     (y + 1) * settings.TILE_SIZE + CROP_Y_OFFSET[CROPS[plant_type - 1]])
+
+        plant_tile = self.plant_tiles.get((x, y))
+        if plant_tile is not None and plant_tile.z == z:
+            plant_tile.image = surface
+            plant_tile.rect = surface.get_rect(midbottom=midbottom)
+            self.all_sprites.relocate(plant_tile)
+            return
+        if plant_tile is not None:
+            plant_tile.kill()
+        self.plant_tiles[(x, y)] = PlantTile(midbottom, surface, (self.all_sprites, self.plant_sprites), z)
 
     def remove_water(self):
         for sprite in self.water_sprites.sprites():
             sprite.kill()
+        self.water_tiles.clear()
 
-        for row in self.grid:
-            for cell in row:
-                if 'W' in cell:
-                    cell.remove('W')
+        self.grid &= np.uint8(~WATERED & 0xFF)
 
     def create_soil_tiles(self):
-        self.soil_sprites.empty()
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'X' in cell:
-                    t = 'X' in self.grid[index_row - 1][index_col]
-                    b = 'X' in self.grid[index_row + 1][index_col]
-                    l = 'X' in row[index_col - 1]
-                    r = 'X' in row[index_col + 1]
-
-                    tile_type = 'o'
-
-                    tile_dict = {
-                        lambda: all((t, b, l, r)): 'x',
-                        lambda: l and not any((t, b, r)): 'r',
-                        lambda: r and not any((t, b, l)): 'l',
-                        lambda: r and l and not any((t, b)): 'lr',
-                        lambda: t and not any((l, b, r)): 'b',
-                        lambda: b and not any((l, t, r)): 't',
-                        lambda: b and t and not any((l, r)): 'tb',
-                        lambda: l and b and not any((t, r)): 'tr',
-                        lambda: r and b and not any((t, l)): 'tl',
-                        lambda: l and t and not any((b, r)): 'br',
-                        lambda: r and t and not any((b, l)): 'bl',
-                        lambda: all((t, b, r)) and not l: 'tbr',
-                        lambda: all((t, b, l)) and not r: 'tbl',
-                        lambda: all((l, r, t)) and not b: 'lrb',
-                        lambda: all((l, r, b)) and not t: 'lrt',
-                    }
-
-                    for predicate, tile_result in tile_dict.items():
-                        if predicate():
-                            tile_type = tile_result
-
-                    x = index_col * settings.TILE_SIZE
-                    y = index_row * settings.TILE_SIZE
-                    SoilTile((x, y), self.soil_surfaces[tile_type], (self.all_sprites, self.soil_sprites,))
+        """Autotiles the whole grid, e.g. after the grid was replaced."""
+        for y, x in np.argwhere(self.grid & TILLED).tolist():
+            self.update_soil_tile(x, y)
+
+    def update_soil_tiles_around(self, x, y):
+        for neighbour_x, neighbour_y in ((x, y), (x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            if 0 <= neighbour_y < self.grid.shape[0] and 0 <= neighbour_x < self.grid.shape[1]:
+                self.update_soil_tile(neighbour_x, neighbour_y)
+
+    def update_soil_tile(self, x, y):
+        soil_tile = self.soil_tiles.get((x, y))
+        if soil_tile is None and not self._is_loaded(x, y):
+            return
+        if not self.grid[y, x] & TILLED:
+            if soil_tile is not None:
+                soil_tile.kill()
+                del self.soil_tiles[(x, y)]
+            return
+
+        surface = self.soil_surfaces[SOIL_TILE_NAMES[self._neighbour_mask(x, y)]]
+        if soil_tile is None:
+            position = (x * settings.TILE_SIZE, y * settings.TILE_SIZE)
+            self.soil_tiles[(x, y)] = SoilTile(position, surface, (self.all_sprites, self.soil_sprites,))
+        else:
+            soil_tile.image = surface
+
+    def _neighbour_mask(self, x, y):
+        grid = self.grid
+        rows, cols = grid.shape
+        mask = 0
+        if y > 0 and grid[y - 1, x] & TILLED:
+            mask |= NEIGHBOUR_TOP
+        if y < rows - 1 and grid[y + 1, x] & TILLED:
+            mask |= NEIGHBOUR_BOTTOM
+        if x > 0 and grid[y, x - 1] & TILLED:
+            mask |= NEIGHBOUR_LEFT
+        if x < cols - 1 and grid[y, x + 1] & TILLED:
+            mask |= NEIGHBOUR_RIGHT
+        return mask
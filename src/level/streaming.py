@@ -0,0 +1,97 @@
+from itertools import count
+
+import pygame
+
+from src import settings
+
+
+class WorldStreamer:
+    """Keeps the map objects of the chunks around a point materialized as sprites and unloads the rest.
+
+    Objects are registered once as spawn callbacks, spawn(state) returning their sprites, where state is
+    whatever a sprite's save_state() returned when its chunk was last unloaded (None the first time).
+    Area listeners get load_area(rect) and unload_area(rect) with the world rect of every chunk that
+    comes and goes, for state kept outside of sprites such as the soil grid.
+    """
+
+    def __init__(self, chunk_size=settings.STREAM_CHUNK_SIZE, radius=settings.STREAM_RADIUS) -> None:
+        super().__init__()
+        self.chunk_size = chunk_size
+        self.radius = radius
+        self.area_listeners = []
+        self._records = {}
+        self._keys = count()
+        self._loaded = {}
+        self._states = {}
+        self._center = None
+
+    def __len__(self):
+        return sum(len(records) for records in self._records.values())
+
+    def add(self, pos, spawn):
+        """Registers an object spawned by spawn(state) in the chunk holding world position pos."""
+        chunk = (int(pos[0] // self.chunk_size), int(pos[1] // self.chunk_size))
+        key = next(self._keys)
+        self._records.setdefault(chunk, []).append((key, spawn))
+        if chunk in self._loaded:
+            self._loaded[chunk].append((key, spawn(None)))
+
+    def loaded_chunks(self):
+        return list(self._loaded)
+
+    def saved_states(self):
+        """States of the objects in unloaded chunks."""
+        return self._states.values()
+
+    def states(self):
+        """Current state of every object that has one, loaded or not, keyed like the spawn records."""
+        states = dict(self._states)
+        for records in self._loaded.values():
+            for key, sprites in records:
+                for sprite in sprites:
+                    if hasattr(sprite, 'save_state'):
+                        states[key] = sprite.save_state()
+        return states
+
+    def restore_states(self, states):
+        """Replaces the saved states; call after unload_all() so the next update() spawns objects with them."""
+        self._states = dict(states)
+
+    def unload_all(self):
+        for chunk in list(self._loaded):
+            self._unload(chunk)
+        self._center = None
+
+    def chunk_rect(self, chunk):
+        return pygame.Rect(chunk[0] * self.chunk_size, chunk[1] * self.chunk_size, self.chunk_size, self.chunk_size)
+
+    def update(self, point):
+        """Loads the chunks within the radius of point and unloads the others, once point changes chunk."""
+        center = (int(point[0] // self.chunk_size), int(point[1] // self.chunk_size))
+        if center == self._center:
+            return
+        self._center = center
+
+        wanted = {(center[0] + x, center[1] + y)
+                  for x in range(-self.radius, self.radius + 1) for y in range(-self.radius, self.radius + 1)}
+        for chunk in [chunk for chunk in self._loaded if chunk not in wanted]:
+            self._unload(chunk)
+        new_chunks = sorted(wanted.difference(self._loaded), key=lambda chunk: (chunk[1], chunk[0]))
+        for chunk in new_chunks:
+            self._loaded[chunk] = []
+            for listener in self.area_listeners:
+                listener.load_area(self.chunk_rect(chunk))
+        # spawn in registration order across the new chunks, so overlapping objects keep their draw order
+        records = sorted(((key, spawn, chunk) for chunk in new_chunks for key, spawn in self._records.get(chunk, ())),
+                         key=lambda record: record[0])
+        for key, spawn, chunk in records:
+            self._loaded[chunk].append((key, spawn(self._states.pop(key, None))))
+
+    def _unload(self, chunk):
+        for key, sprites in self._loaded.pop(chunk):
+            for sprite in sprites:
+                if hasattr(sprite, 'save_state'):
+                    self._states[key] = sprite.save_state()
+                sprite.kill()
+        for listener in self.area_listeners:
+            listener.unload_area(self.chunk_rect(chunk))
@@ -1,40 +1,48 @@
-import pygame.display
-
 from src import settings
+from src.level.sky import Sky
 from src.player import Player
-from src.timer import Timer
+from src.timer import StagedJob, Timer
 
 
 class DayTransition:
-    def __init__(self, reset, player: Player) -> None:
+    """Fades out and back in while the day rolls over.
+
+    reset() returns the rollover as a generator of steps, run within ROLLOVER_BUDGET_MS per frame during
+    the fade out and finished at the latest when the screen starts fading back in.
+    """
+
+    def __init__(self, reset, player: Player, sky: Sky) -> None:
         super().__init__()
-        self._display_surface = pygame.display.get_surface()
         self._player = player
+        self._sky = sky
         self._reset = reset
+        self._job = None
         self._timer = Timer(2500, self.stop)
 
-        self._image = None
         self._color = 255
         self._speed = 0
 
     def start(self):
-        self._image = pygame.Surface((settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT))
         self._color = 255
         self._speed = -2
+        self._job = StagedJob(self._reset())
         self._timer.activate()
 
     def stop(self):
-        self._reset()
+        self._job.finish()
+        self._sky.set_fade(255)
         self._player.sleep = False
 
     def update(self):
-        self._timer.update()
+        if not self._job.done:
+            self._job.run(settings.ROLLOVER_BUDGET_MS)
         self._color += self._speed
         if self._color <= 0:
             self._color = 0
             self._speed *= -1
+            # the new day has to be complete before it is revealed
+            self._job.finish()
         if self._color >= 255:
             self._color = 255
             self._speed = -2
-        self._image.fill((self._color, self._color, self._color))
-        self._display_surface.blit(self._image, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        self._sky.set_fade(self._color)
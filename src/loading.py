@@ -0,0 +1,33 @@
+import pygame
+
+from src import settings
+from src.support import asset_cache, image_files
+
+
+class LoadingScreen:
+    """Progress bar shown while the asset cache decodes image files in the background."""
+
+    def __init__(self, surface) -> None:
+        super().__init__()
+        self.surface = surface
+        self.font = pygame.font.Font('../font/LycheeSoda.ttf', 30)
+        self.bar = pygame.Rect(0, 0, settings.SCREEN_WIDTH // 2, 20)
+        self.bar.center = (settings.SCREEN_WIDTH // 2, settings.SCREEN_HEIGHT // 2)
+
+    def draw(self, done, total):
+        self.surface.fill('black')
+        text = self.font.render(f'Loading... {done}/{total}', False, 'white')
+        self.surface.blit(text, text.get_rect(midbottom=(self.bar.centerx, self.bar.top - 10)))
+        pygame.draw.rect(self.surface, 'white', self.bar, 2)
+        fill = self.bar.inflate(-6, -6)
+        fill.width = round(fill.width * done / total) if total else fill.width
+        pygame.draw.rect(self.surface, 'white', fill)
+
+    def run(self, paths=None):
+        """Preloads paths (every image under ../graphics by default), drawing the progress as files finish."""
+        paths = image_files('../graphics') if paths is None else paths
+        for done, total in asset_cache.preload(paths):
+            # keep the window responsive; quitting waits for the loading to finish
+            pygame.event.pump()
+            self.draw(done, total)
+            pygame.display.update()
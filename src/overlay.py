@@ -1,6 +1,7 @@
 import pygame.display
 
 from src import settings
+from src.support import asset_cache
 
 
 class Overlay:
@@ -11,18 +12,33 @@ class Overlay:
         self.player = player
 
         overlay_path = '../graphics/overlay'
-        self.tools_surface = {tool: pygame.image.load(f'{overlay_path}/{tool}.png').convert_alpha() for tool in
+        self.tools_surface = {tool: asset_cache.image(f'{overlay_path}/{tool}.png') for tool in
                               self.player.tools}
-        self.seeds_surface = {seed: pygame.image.load(f'{overlay_path}/{seed}.png').convert_alpha() for seed in
+        self.seeds_surface = {seed: asset_cache.image(f'{overlay_path}/{seed}.png') for seed in
                               self.player.seeds}
+        self._displayed_rects = []
 
     def display(self):
-        self._display_item('tool')
-        self._display_item('seed')
+        self._displayed_rects = [self._display_item('tool'), self._display_item('seed')]
+
+    def rects(self):
+        """Screen rects the overlay covers now and covered when last displayed.
+
+        Repainted every frame since the selection can change, the old rects included so a smaller
+        icon does not leave the previous one behind.
+        """
+        return [self._item_rect(item_attr) for item_attr in ('tool', 'seed')] + self._displayed_rects
+
+    def _item_surface(self, item_attr: str):
+        return getattr(self, f'{item_attr}s_surface')[getattr(self.player, f'selected_{item_attr}')]
+
+    def _item_rect(self, item_attr: str):
+        return self._item_surface(item_attr).get_rect(midbottom=settings.OVERLAY_POSITIONS[item_attr])
 
     def _display_item(self, item_attr: str):
         # if item_attr != 'seed' or item_attr != 'tool':
         #     raise Exception("Wrong attr")
-        surface = getattr(self, f'{item_attr}s_surface')[getattr(self.player, f'selected_{item_attr}')]
-        surface_rect = surface.get_rect(midbottom=settings.OVERLAY_POSITIONS[item_attr])
+        surface = self._item_surface(item_attr)
+        surface_rect = self._item_rect(item_attr)
         self.display_surface.blit(surface, surface_rect)
+        return surface_rect
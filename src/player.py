@@ -3,26 +3,32 @@ from typing import Optional
 import pygame
 
 from src import settings
+from src.animation import Animator, clip_registry
+from src.controls import KeyboardControls
 from src.level.soil import SoilLayer
-from src.support import import_folder
 from src.timer import Timer
 
 
+ANIMATIONS = ('up', 'down', 'left', 'right',
+              'right_idle', 'left_idle', 'up_idle', 'down_idle',
+              'right_hoe', 'left_hoe', 'up_hoe', 'down_hoe',
+              'right_axe', 'left_axe', 'up_axe', 'down_axe',
+              'right_water', 'left_water', 'up_water', 'down_water')
+
+
 class Player(pygame.sprite.Sprite):
-    def __init__(self, pos, all_sprites, collision_group, trees_group, interaction_group, soil_layer) -> None:
-        super().__init__(all_sprites)
+    dynamic = True
 
-        self.animations = {'up': [], 'down': [], 'left': [], 'right': [],
-                           'right_idle': [], 'left_idle': [], 'up_idle': [], 'down_idle': [],
-                           'right_hoe': [], 'left_hoe': [], 'up_hoe': [], 'down_hoe': [],
-                           'right_axe': [], 'left_axe': [], 'up_axe': [], 'down_axe': [],
-                           'right_water': [], 'left_water': [], 'up_water': [], 'down_water': []}
+    def __init__(self, pos, all_sprites, collision_group, trees_group, interaction_group, soil_layer,
+                 controls=None) -> None:
+        super().__init__(all_sprites)
+        self.controls = controls if controls is not None else KeyboardControls()
 
+        self.animator: Optional[Animator] = None
         self.import_assets()
         self.status = 'down_idle'
-        self.frame_index = 0
 
-        self.image = self.animations[self.status][self.frame_index]
+        self.image = self.animator.frame(self.status)
         self.rect = self.image.get_rect(center=pos)
         self.hitbox = self.rect.copy().inflate((-126, -70))
         self.z = settings.LAYERS['main']
@@ -61,6 +67,12 @@ class Player(pygame.sprite.Sprite):
         self.sleep = False
         self.target_pos = None
 
+    def place(self, pos):
+        """Moves the player to pos without colliding, e.g. when a save is loaded."""
+        self.rect.center = pos
+        self.hitbox.center = self.rect.center
+        self.pos.update(self.hitbox.center)
+
     def use_tool(self):
         if self.selected_tool == 'hoe':
             self.soil_layer.get_hit(self.target_pos)
@@ -75,7 +87,7 @@ class Player(pygame.sprite.Sprite):
         self.target_pos = self.rect.center + settings.PLAYER_TOOL_OFFSET[self.status.split("_")[0]]
 
     def use_seed(self):
-        print(self.selected_seed)
+        self.soil_layer.plant_seed(self.target_pos, self.selected_seed)
 
     def switch_tool(self):
         self.tool_index += 1
@@ -89,67 +101,59 @@ class Player(pygame.sprite.Sprite):
             self.seed_index = 0
         self.selected_seed = self.seeds[self.seed_index]
 
-    def update_timers(self):
-        for timer in self.timers.values():
-            timer.update()
-
     def import_assets(self):
-        for animation in self.animations.keys():
-            full_path = '../graphics/character/' + animation
-            self.animations[animation] = import_folder(full_path)
+        clips = {animation: clip_registry.load(f'character/{animation}', '../graphics/character/' + animation, 4)
+                 for animation in ANIMATIONS}
+        self.animator = Animator(clips)
 
     def animate(self, dt):
-        self.frame_index += 4 * dt
-        if self.frame_index >= len(self.animations[self.status]):
-            self.frame_index = 0
-
-        self.image = self.animations[self.status][int(self.frame_index)]
+        self.image = self.animator.advance(self.status, dt)
 
     def input(self):
-        keys = pygame.key.get_pressed()
+        actions = self.controls.actions()
 
         if self.timers['tool_use'].active or self.sleep:
             return
 
-        if keys[pygame.K_UP]:
+        if 'up' in actions:
             self.status = 'up'
             self.direction.y = -1
-        elif keys[pygame.K_DOWN]:
+        elif 'down' in actions:
             self.status = 'down'
             self.direction.y = 1
         else:
             self.direction.y = 0
 
-        if keys[pygame.K_LEFT]:
+        if 'left' in actions:
             self.status = 'left'
             self.direction.x = -1
-        elif keys[pygame.K_RIGHT]:
+        elif 'right' in actions:
             self.status = 'right'
             self.direction.x = 1
         else:
             self.direction.x = 0
 
-        if keys[pygame.K_SPACE]:
+        if 'tool' in actions:
             if not self.timers['tool_use'].active:
                 self.timers['tool_use'].activate()
                 self.direction = pygame.math.Vector2()
-                self.frame_index = 0
+                self.animator.reset()
 
-        if keys[pygame.K_LCTRL]:
+        if 'seed' in actions:
             if not self.timers['seed_use'].active:
                 self.timers['seed_use'].activate()
                 self.direction = pygame.math.Vector2()
-                self.frame_index = 0
+                self.animator.reset()
 
-        if keys[pygame.K_q]:
+        if 'switch_tool' in actions:
             if not self.timers['tool_switch'].active:
                 self.timers['tool_switch'].activate()
 
-        if keys[pygame.K_e]:
+        if 'switch_seed' in actions:
             if not self.timers['seed_switch'].active:
                 self.timers['seed_switch'].activate()
 
-        if keys[pygame.K_RETURN]:
+        if 'interact' in actions:
             collided_interaction = pygame.sprite.spritecollide(sprite=self,
                                                                group=self.interaction_group,
                                                                dokill=False)
@@ -187,30 +191,28 @@ class Player(pygame.sprite.Sprite):
         self.collision('vertical')
 
     def collision(self, direction):
-        for sprite in self.collision_group.sprites():
-            if hasattr(sprite, 'hitbox'):
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if direction == 'horizontal':
-                        if self.direction.x > 0:
-                            self.hitbox.right = sprite.hitbox.left
-                        if self.direction.x < 0:
-                            self.hitbox.left = sprite.hitbox.right
-                        self.rect.centerx = self.hitbox.centerx
-                        self.pos.x = self.hitbox.centerx
-                    if direction == 'vertical':
-                        if self.direction.y > 0:
-                            self.hitbox.bottom = sprite.hitbox.top
-                        if self.direction.y < 0:
-                            self.hitbox.top = sprite.hitbox.bottom
-                        self.rect.centery = self.hitbox.centery
-                        self.pos.y = self.hitbox.centery
+        for hitbox in self.collision_group.hitboxes_near(self.hitbox):
+            if hitbox.colliderect(self.hitbox):
+                if direction == 'horizontal':
+                    if self.direction.x > 0:
+                        self.hitbox.right = hitbox.left
+                    if self.direction.x < 0:
+                        self.hitbox.left = hitbox.right
+                    self.rect.centerx = self.hitbox.centerx
+                    self.pos.x = self.hitbox.centerx
+                if direction == 'vertical':
+                    if self.direction.y > 0:
+                        self.hitbox.bottom = hitbox.top
+                    if self.direction.y < 0:
+                        self.hitbox.top = hitbox.bottom
+                    self.rect.centery = self.hitbox.centery
+                    self.pos.y = self.hitbox.centery
 
     def update(self, dt):
         self.input()
         self.get_status()
         self.move(dt)
         self.animate(dt)
-        self.update_timers()
         self.get_target_pos()
 
 
@@ -0,0 +1,110 @@
+import csv
+import json
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+
+import pygame
+
+HUD_COLORS = ('#e6194b', '#3cb44b', '#ffe119', '#4363d8', '#f58231', '#911eb4', '#42d4f4', '#f032e6')
+
+
+class FrameProfiler:
+    """Times named scopes of every frame, draws a rolling HUD graph and dumps per-frame timings.
+
+    Every frame is only kept for dump() while recording is set; the HUD keeps the last history frames.
+    """
+
+    def __init__(self, history=240) -> None:
+        super().__init__()
+        self.hud_visible = False
+        self.recording = False
+        self.scope_names = []
+        self.frames = []
+        self._history = deque(maxlen=history)
+        self._current = {}
+        self._frame_start = perf_counter()
+        self._font = None
+
+    @contextmanager
+    def scope(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (perf_counter() - start) * 1000
+            if name not in self._current:
+                self._current[name] = 0.0
+                if name not in self.scope_names:
+                    self.scope_names.append(name)
+            self._current[name] += elapsed
+
+    def start(self):
+        """Starts timing the first frame now, so it does not include everything since the import."""
+        self._current = {}
+        self._frame_start = perf_counter()
+
+    def end_frame(self):
+        now = perf_counter()
+        timings = self._current
+        timings['frame'] = (now - self._frame_start) * 1000
+        self._frame_start = now
+        if self.recording:
+            self.frames.append(timings)
+        self._history.append(timings)
+        self._current = {}
+
+    def toggle_hud(self):
+        self.hud_visible = not self.hud_visible
+
+    def averages(self):
+        """Mean milliseconds per scope over the HUD history."""
+        if not self._history:
+            return {}
+        return {name: sum(frame.get(name, 0.0) for frame in self._history) / len(self._history)
+                for name in self.scope_names + ['frame']}
+
+    def draw_hud(self, surface, layer_counts=None):
+        if self._font is None:
+            self._font = pygame.font.Font('../font/LycheeSoda.ttf', 20)
+
+        # stacked bar per frame, 3 px per ms, with a line at the 60 fps budget
+        graph = pygame.Rect(10, 10, self._history.maxlen, 100)
+        pygame.draw.rect(surface, (0, 0, 0), graph)
+        for x, frame in enumerate(self._history):
+            bottom = graph.bottom
+            for index, name in enumerate(self.scope_names):
+                height = round(frame.get(name, 0.0) * 3)
+                if height:
+                    top = max(bottom - height, graph.top)
+                    pygame.draw.line(surface, HUD_COLORS[index % len(HUD_COLORS)],
+                                     (graph.left + x, bottom - 1), (graph.left + x, top))
+                    bottom = top
+        budget_y = graph.bottom - round(1000 / 60 * 3)
+        pygame.draw.line(surface, 'white', (graph.left, budget_y), (graph.right, budget_y))
+
+        lines = [(f"{name}: {ms:.2f} ms", HUD_COLORS[index % len(HUD_COLORS)] if name != 'frame' else 'white')
+                 for index, (name, ms) in enumerate(self.averages().items())]
+        for name, count in (layer_counts or {}).items():
+            lines.append((f"{name}: {count} sprites", 'white'))
+        y = graph.bottom + 5
+        for text, color in lines:
+            surface.blit(self._font.render(text, False, color, (0, 0, 0)), (graph.left, y))
+            y += self._font.get_linesize()
+
+    def dump(self, path):
+        """Writes every recorded frame to path, as JSON for a .json path and CSV otherwise."""
+        columns = ['frame'] + self.scope_names
+        if path.endswith('.json'):
+            with open(path, 'w') as dump_file:
+                json.dump({'scopes': self.scope_names, 'frames': self.frames}, dump_file)
+            return
+
+        with open(path, 'w', newline='') as dump_file:
+            writer = csv.writer(dump_file)
+            writer.writerow(['index'] + [f'{column}_ms' for column in columns])
+            for index, frame in enumerate(self.frames):
+                writer.writerow([index] + [f"{frame.get(column, 0.0):.4f}" for column in columns])
+
+
+profiler = FrameProfiler()
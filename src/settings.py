@@ -5,7 +5,56 @@ SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 TILE_SIZE = 64
 
+# camera culling cells, multiple of TILE_SIZE
+SPATIAL_CELL_SIZE = TILE_SIZE * 4
+# collision broadphase cells, multiple of TILE_SIZE
+COLLISION_CELL_SIZE = TILE_SIZE * 2
+
+# static tile layers are baked into square chunk surfaces of this size
+BAKE_STATIC_LAYERS = True
+CHUNK_SIZE = 512
+
+# map objects are materialized for the streaming chunks within STREAM_RADIUS chunks of the player;
+# STREAM_CHUNK_SIZE * STREAM_RADIUS must exceed half the screen size
+STREAM_CHUNK_SIZE = TILE_SIZE * 16
+STREAM_RADIUS = 1
+
+# rain particles spawned per second, per pool (drops and floor splashes)
+RAIN_SPAWN_RATE = 300
+RAIN_CAPACITY = 512
+
 DEBUG = False
+# milliseconds per frame spent on the day rollover while the sleep transition fades out
+ROLLOVER_BUDGET_MS = 2
+# world save file and the seconds of game time between autosaves
+SAVE_PATH = '../saves/world.sav'
+AUTOSAVE_INTERVAL = 60
+# repaint and present only the screen areas that changed while the camera stands still
+DIRTY_RECTS = False
+DIRTY_RECTS_MAX = 32
+DIRTY_AREA_MAX = 0.5
+
+# fixed-timestep loop: simulation ticks per second, render frame cap (0 = uncapped)
+# and the longest frame simulated before the game slows down instead of spiralling
+SIMULATION_RATE = 60
+FPS_CAP = 120
+MAX_FRAME_TIME = 0.25
+
+# day/night cycle: seconds per day, the time of day the player wakes up at (0 is midnight, 0.5 noon)
+# and the world tint at key times of the day, interpolated into SKY_LUT_SIZE steps
+DAY_LENGTH = 12 * 60
+DAY_START = 0.25
+SKY_COLORS = (
+    (0.0, (38, 101, 189)),
+    (0.17, (38, 101, 189)),
+    (0.21, (255, 200, 160)),
+    (0.25, (255, 255, 255)),
+    (0.75, (255, 255, 255)),
+    (0.8, (255, 170, 120)),
+    (0.85, (38, 101, 189)),
+    (1.0, (38, 101, 189)),
+)
+SKY_LUT_SIZE = 256
 
 # overlay positions 
 OVERLAY_POSITIONS = {
@@ -33,6 +82,10 @@ LAYERS = {
     'rain drops': 10
 }
 
+# layers holding moving sprites, which are put back in y order every frame
+DYNAMIC_LAYERS = {LAYERS['main'], LAYERS['rain drops']}
+
+
 APPLE_POS = {
     'Small': [(18, 17), (30, 37), (12, 50), (30, 45), (20, 30), (30, 10)],
     'Large': [(30, 24), (60, 65), (50, 50), (16, 40), (45, 50), (42, 70)]
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+
+class SpatialHash:
+    """Buckets items into square cells so rect queries only touch nearby items.
+
+    Queries are broad: they return every item sharing a cell with the rect, callers do the exact test.
+    Items spanning more than ``max_cells`` cells (e.g. the ground) are kept aside and always returned.
+    """
+
+    def __init__(self, cell_size, max_cells=64) -> None:
+        super().__init__()
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._cells = defaultdict(dict)
+        self._item_cells = {}
+        self._oversized = {}
+
+    def __len__(self):
+        return len(self._item_cells) + len(self._oversized)
+
+    def __contains__(self, item):
+        return item in self._item_cells or item in self._oversized
+
+    def items(self):
+        return [*self._item_cells, *self._oversized]
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return rect.left // size, rect.top // size, (rect.right - 1) // size, (rect.bottom - 1) // size
+
+    def insert(self, item, rect):
+        left, top, right, bottom = cell_range = self._cell_range(rect)
+        if (right - left + 1) * (bottom - top + 1) > self.max_cells:
+            self._oversized[item] = None
+            return
+
+        self._item_cells[item] = cell_range
+        for cell_x in range(left, right + 1):
+            for cell_y in range(top, bottom + 1):
+                self._cells[(cell_x, cell_y)][item] = None
+
+    def remove(self, item):
+        if item in self._oversized:
+            del self._oversized[item]
+            return
+
+        left, top, right, bottom = self._item_cells.pop(item)
+        for cell_x in range(left, right + 1):
+            for cell_y in range(top, bottom + 1):
+                cell = self._cells[(cell_x, cell_y)]
+                del cell[item]
+                if not cell:
+                    del self._cells[(cell_x, cell_y)]
+
+    def move(self, item, rect):
+        """Re-buckets an item, doing nothing when it stays within the same cells."""
+        if self._item_cells.get(item) != self._cell_range(rect):
+            self.remove(item)
+            self.insert(item, rect)
+
+    def query(self, rect):
+        left, top, right, bottom = self._cell_range(rect)
+        found = dict(self._oversized)
+        cells = self._cells
+        for cell_x in range(left, right + 1):
+            for cell_y in range(top, bottom + 1):
+                cell = cells.get((cell_x, cell_y))
+                if cell:
+                    found.update(cell)
+        return found
@@ -4,19 +4,27 @@ from random import randint, choice
 import pygame
 
 from src import settings
+from src.animation import SharedClock, clip_registry
+from src.effects import effects
 from src.player import PlayerInventoryManager
-from src.support import game_tile_pos_tuple, import_folder
+from src.support import game_tile_pos_tuple, asset_cache
 from src.timer import Timer
 
 
 class Generic(pygame.sprite.Sprite):
+    # moving sprites are re-bucketed by the camera every frame
+    dynamic = False
 
     def __init__(self, pos, surface, groups, z=settings.LAYERS['main']) -> None:
         super().__init__(groups)
         self.image = surface
         self.rect = self.image.get_rect(topleft=pos)
         self.z = z
-        self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.2, -self.rect.height * 0.75)
+        self.hitbox = self.default_hitbox(self.rect)
+
+    @staticmethod
+    def default_hitbox(rect):
+        return rect.copy().inflate(-rect.width * 0.2, -rect.height * 0.75)
 
 
 class WildFlower(Generic):
@@ -26,24 +34,6 @@ class WildFlower(Generic):
         self.hitbox = self.rect.copy().inflate(-20, -self.rect.height * 0.9)
 
 
-class Particle(Generic):
-
-    def __init__(self, pos, surface, groups, z=settings.LAYERS['main'], duration=200) -> None:
-        super().__init__(pos, surface, groups, z)
-        self.start_time = pygame.time.get_ticks()
-        self.duration = duration
-
-        mask_surface = pygame.mask.from_surface(self.image)
-        new_surface = mask_surface.to_surface()
-        new_surface.set_colorkey((0, 0, 0))
-        self.image = new_surface
-
-    def update(self, dt):
-        current_time = pygame.time.get_ticks()
-        if current_time - self.start_time > self.duration:
-            self.kill()
-
-
 class TreeType(Enum):
     SMALL = 0,
     LARGE = 1
@@ -52,7 +42,7 @@ class TreeType(Enum):
 class Tree(Generic):
 
     def __init__(self, pos, surface, groups, z=settings.LAYERS['main'], name=None,
-                 player_inventory_manager=None) -> None:
+                 player_inventory_manager=None, state=None) -> None:
         super().__init__(pos, surface, groups, z)
         self.all_sprites = self.groups()[0]
         self.health = 5
@@ -60,25 +50,53 @@ class Tree(Generic):
 
         self.name = name
 
-        self.apples_surface = pygame.image.load('../graphics/fruit/apple.png')
+        self.apples_surface = asset_cache.image('../graphics/fruit/apple.png')
         self.apple_pos = settings.APPLE_POS[name]
         self.apple_sprites = pygame.sprite.Group()
-        self.create_fruit()
 
         self._tree_type: TreeType = TreeType.SMALL if name == 'Small' else TreeType.LARGE
         stump_path = f'../graphics/stumps/{"small.png" if self._tree_type == TreeType.SMALL else "large.png"}'
-        self.stump_surface = pygame.image.load(stump_path)
+        self.stump_surface = asset_cache.image(stump_path)
         self.invul_timer = Timer(200)
 
         self._player_inventory_manager: PlayerInventoryManager = player_inventory_manager
 
+        if state is None:
+            self.create_fruit()
+        else:
+            self.restore_state(state)
+
+    def save_state(self):
+        """Health and apples to restore the tree with when it is streamed back in."""
+        return {'health': self.health,
+                'alive': self.alive,
+                'apples': [apple.rect.topleft for apple in self.apple_sprites.sprites()]}
+
+    def restore_state(self, state):
+        self.health = state['health']
+        if not state['alive']:
+            self.alive = False
+            self._become_stump()
+        # without saved apples (e.g. a new day passed while unloaded) the tree grows new ones
+        if state.get('apples') is None:
+            self.create_fruit()
+        else:
+            for pos in state['apples']:
+                self._add_apple(pos)
+
+    def kill(self):
+        for apple in self.apple_sprites.sprites():
+            apple.kill()
+        super().kill()
+
     def damage(self):
-        self.health -= 1
+        # stumps still drop their fruit when hit; health stays within what a save can store
+        self.health = max(self.health - 1, 0)
 
         apple_sprites = self.apple_sprites.sprites()
         if len(apple_sprites) > 0:
             random_apple = choice(apple_sprites)
-            Particle(random_apple.rect.topleft, random_apple.image, (self.all_sprites,), z=settings.LAYERS['fruit'])
+            effects.emit(random_apple.rect.topleft, random_apple.image, (self.all_sprites,), z=settings.LAYERS['fruit'])
             random_apple.kill()
             self._player_inventory_manager.add_to_inventory('apple')
 
@@ -89,18 +107,25 @@ class Tree(Generic):
             elif self._tree_type == TreeType.LARGE:
                 self._player_inventory_manager.add_to_inventory('wood', 5)
             self.alive = False
-            Particle(self.rect.topleft, self.image, (self.all_sprites,), z=settings.LAYERS['fruit'], duration=300)
-            self.image = self.stump_surface
-            self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
-            self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
+            effects.emit(self.rect.topleft, self.image, (self.all_sprites,), z=settings.LAYERS['fruit'], duration=300)
+            self._become_stump()
+
+    def _become_stump(self):
+        self.image = self.stump_surface
+        self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
+        self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
+        for group in self.groups():
+            if hasattr(group, 'relocate'):
+                group.relocate(self)
 
     def create_fruit(self):
         for pos in self.apple_pos:
             if randint(0, 10) < 2:
-                x = pos[0] + self.rect.left
-                y = pos[1] + self.rect.top
-                Generic(pos=(x, y), surface=self.apples_surface, groups=(self.apple_sprites, self.groups()[0],),
-                        z=settings.LAYERS['fruit'])
+                self._add_apple((pos[0] + self.rect.left, pos[1] + self.rect.top))
+
+    def _add_apple(self, pos):
+        Generic(pos=pos, surface=self.apples_surface, groups=(self.apple_sprites, self.groups()[0],),
+                z=settings.LAYERS['fruit'])
 
     def update(self, dt):
         if self.alive:
@@ -109,21 +134,18 @@ class Tree(Generic):
 
 class Water(Generic):
 
-    def __init__(self, pos, frames, groups, z=settings.LAYERS['water']) -> None:
-        self.frames = frames
-        self.frame_index = 0
-        surface = self.frames[self.frame_index] if self.frames is not None else None
-        super().__init__(pos=pos, surface=surface, groups=groups, z=z)
+    def __init__(self, pos, clock: SharedClock, groups, z=settings.LAYERS['water']) -> None:
+        self.clock = clock
+        super().__init__(pos=pos, surface=clock.frame, groups=groups, z=z)
 
-    def animate(self, dt):
-        self.frame_index += 5 * dt
-        if self.frame_index >= len(self.frames):
-            self.frame_index = 0
+    @property
+    def image(self):
+        # every water tile shows the frame of the shared clock, so there is nothing to update per tile
+        return self.clock.frame
 
-        self.image = self.frames[int(self.frame_index)]
-
-    def update(self, dt):
-        self.animate(dt)
+    @image.setter
+    def image(self, surface):
+        pass
 
 
 class Interaction(Generic):
@@ -139,8 +161,8 @@ class LevelSpriteFactory:
     @staticmethod
     def create(clazz, x, y, surface, groups, z, **kwargs):
         if clazz == Water:
-            water_frames = import_folder('../graphics/water')
-            return Water(game_tile_pos_tuple(x, y), water_frames, groups=groups, z=z)
+            water_clock = clip_registry.shared_clock(clip_registry.load('water', '../graphics/water', 5))
+            return Water(game_tile_pos_tuple(x, y), water_clock, groups=groups, z=z)
         elif clazz == Generic:
             return Generic(game_tile_pos_tuple(x, y), surface, groups=groups, z=z)
         elif clazz == WildFlower:
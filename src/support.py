@@ -1,32 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from os import walk
+from os.path import normpath
+
 import pygame
 
 from src import settings
+from src.tilemap import load_tilemap
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tga')
+
 
+def _load_image(path):
+    return pygame.image.load(path).convert_alpha()
 
-def _import_image_surface(path, storage, func):
+
+def _import_image_surface(path, storage, func, load_image=_load_image):
     for _, __, img_files in walk(path):
         for image_file in img_files:
             full_path = f"{path}/{image_file}"
-            image_surface = pygame.image.load(full_path).convert_alpha()
+            image_surface = load_image(full_path)
             func(storage, image_surface, image_file)
     return storage
 
 
-def import_folder(path):
+def import_folder(path, load_image=_load_image):
     surface_list = []
-    _import_image_surface(path, surface_list, lambda storage, image_surface, image_file: storage.append(image_surface))
+    _import_image_surface(path, surface_list, lambda storage, image_surface, image_file: storage.append(image_surface),
+                          load_image)
     return surface_list
 
 
-def import_folder_dict(path):
+def import_folder_dict(path, load_image=_load_image):
     def _save_into_dict(storage, image_surface, image_file):
         storage[image_file.split('.')[0]] = image_surface
 
     surface_dict = {}
-    _import_image_surface(path, surface_dict, _save_into_dict)
+    _import_image_surface(path, surface_dict, _save_into_dict, load_image)
     return surface_dict
 
 
+def image_files(path):
+    """Paths of every image file under path, in the same form import_folder builds them."""
+    return [f"{directory}/{image_file}" for directory, _, img_files in walk(path) for image_file in img_files
+            if image_file.lower().endswith(IMAGE_EXTENSIONS)]
+
+
 def game_tile_pos_tuple(x, y):
     return x * settings.TILE_SIZE, y * settings.TILE_SIZE
+
+
+class AssetCache:
+    """Memoizes decoded assets by path so every caller shares the same surfaces.
+
+    Returned surfaces, lists and dicts are shared between instances and must not be modified.
+    Image files can be decoded ahead of time on worker threads with preload(); the decoded surfaces
+    nobody asked for are dropped with discard_preloaded().
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._storage = {}
+        self._decoded = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, kind, path, load):
+        key = (kind, normpath(path))
+        if key in self._storage:
+            self.hits += 1
+            return self._storage[key]
+
+        self.misses += 1
+        asset = self._storage[key] = load()
+        return asset
+
+    def _decode(self, path):
+        """Unconverted surface of an image file, taken from the preloaded ones when it is there."""
+        surface = self._decoded.pop(normpath(path), None)
+        return pygame.image.load(path) if surface is None else surface
+
+    def preload(self, paths, workers=None):
+        """Decodes image files on a thread pool, yielding (done, total) as each one finishes.
+
+        Only the file read and decode run off the main thread; surfaces are converted to the display
+        format when first asked for, so iterate this on the main thread after the display mode is set.
+        """
+        paths = [path for path in dict.fromkeys(normpath(path) for path in paths)
+                 if path not in self._decoded and ('image', path) not in self._storage]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(pygame.image.load, path): path for path in paths}
+            for done, future in enumerate(as_completed(futures), 1):
+                self._decoded[futures[future]] = future.result()
+                yield done, len(paths)
+
+    def discard_preloaded(self):
+        """Drops the preloaded surfaces not asked for yet, returning how many; they load from disk if needed later."""
+        count = len(self._decoded)
+        self._decoded.clear()
+        return count
+
+    def image(self, path):
+        return self._get('image', path, lambda: self._decode(path).convert_alpha())
+
+    def folder(self, path):
+        return self._get('folder', path, lambda: import_folder(path, self.image))
+
+    def folder_dict(self, path):
+        return self._get('folder_dict', path, lambda: import_folder_dict(path, self.image))
+
+    def tilemap(self, path):
+        return self._get('tilemap', path, lambda: load_tilemap(path, self._decode))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._storage)}
+
+    def clear(self):
+        self._storage.clear()
+        self._decoded.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+asset_cache = AssetCache()
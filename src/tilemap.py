@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import struct
+from xml.etree import ElementTree
+
+import numpy as np
+import pygame
+import pytmx
+from pytmx.util_pygame import handle_transformation, smart_convert
+
+# cache file layout: header, JSON metadata, then the raw tile-ID arrays of every tile layer
+CACHE_MAGIC = b'PVMC'
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct('<4sII')
+
+
+class TileLayer:
+    """Tile-ID array of a map layer, addressed as gids[y, x]; 0 means no tile."""
+
+    def __init__(self, tilemap, name, gids) -> None:
+        super().__init__()
+        self.tilemap = tilemap
+        self.name = name
+        self.gids = gids
+
+    def tiles(self):
+        """Yields x, y, surface for every tile, row by row like pytmx."""
+        for y, x in zip(*np.nonzero(self.gids)):
+            yield int(x), int(y), self.tilemap.tile_image(int(self.gids[y, x]))
+
+    def runs(self):
+        """Horizontal runs of tiles as an (n, 3) array of y, first x and last x + 1, row by row."""
+        padded = np.pad(self.gids != 0, ((0, 0), (1, 1))).astype(np.int8)
+        edges = np.diff(padded, axis=1)
+        starts = np.argwhere(edges == 1)
+        ends = np.argwhere(edges == -1)
+        return np.column_stack((starts, ends[:, 1]))
+
+
+class MapObject:
+
+    def __init__(self, tilemap, x, y, width, height, name, gid) -> None:
+        super().__init__()
+        self.tilemap = tilemap
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.name = name
+        self.gid = gid
+
+    @property
+    def image(self):
+        return self.tilemap.tile_image(self.gid) if self.gid else None
+
+
+class ObjectLayer(list):
+
+    def __init__(self, name, objects) -> None:
+        super().__init__(objects)
+        self.name = name
+
+
+class CompiledMap:
+    """Map loaded from a compiled cache: tile-ID arrays, objects and where every tile image comes from.
+
+    Tile surfaces are cut from their tileset images the first time they are asked for.
+    """
+
+    def __init__(self, path, meta, data, load_image=pygame.image.load) -> None:
+        super().__init__()
+        self.path = path
+        self._load_image = load_image
+        self._directory = os.path.dirname(path)
+        self._image_refs = meta['images']
+        self._tile_images = {}
+        self._sheets = {}
+        self.layers = {}
+
+        for layer in meta['layers']:
+            if layer['type'] == 'tiles':
+                gids = np.frombuffer(data, dtype=layer['dtype'], count=layer['width'] * layer['height'],
+                                     offset=layer['offset']).reshape(layer['height'], layer['width'])
+                self.layers[layer['name']] = TileLayer(self, layer['name'], gids)
+            else:
+                self.layers[layer['name']] = ObjectLayer(layer['name'], [MapObject(self, *obj)
+                                                                         for obj in layer['objects']])
+
+    def get_layer_by_name(self, name):
+        return self.layers[name]
+
+    def tile_image(self, gid):
+        if gid in self._tile_images:
+            return self._tile_images[gid]
+
+        source, rect, flags, colorkey = self._image_refs[gid]
+        if source not in self._sheets:
+            self._sheets[source] = self._load_image(os.path.join(self._directory, source))
+        # same conversion pytmx.load_pygame applies, so tiles look and blit the same
+        tile = self._sheets[source].subsurface(rect) if rect else self._sheets[source].copy()
+        if flags:
+            tile = handle_transformation(tile, pytmx.TileFlags(*(bool(flags & 1 << bit) for bit in range(3))))
+        if colorkey:
+            colorkey = pygame.Color(f'#{colorkey}')
+        tile = self._tile_images[gid] = smart_convert(tile, colorkey, True)
+        return tile
+
+
+def cache_path(path):
+    return f'{os.path.splitext(path)[0]}.mapcache'
+
+
+def _fingerprint(path, known=None):
+    """[mtime_ns, size, sha1] of a file; the hash is only recomputed when mtime or size differ from known."""
+    stat = os.stat(path)
+    if known is not None and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+        return known
+    with open(path, 'rb') as source_file:
+        return [stat.st_mtime_ns, stat.st_size, hashlib.sha1(source_file.read()).hexdigest()]
+
+
+def _record_image(filename, colorkey, **kwargs):
+    """pytmx image loader that records where each tile image comes from instead of decoding it."""
+
+    def record(rect=None, flags=None):
+        flag_bits = sum(1 << bit for bit, flag in enumerate(flags) if flag) if flags else 0
+        return filename, list(rect) if rect else None, flag_bits, colorkey
+
+    return record
+
+
+def compile_map(path):
+    """Parses the TMX at path into the metadata and tile-ID array blob of a map cache."""
+    directory = os.path.dirname(path)
+    tiled_map = pytmx.TiledMap(path, image_loader=_record_image)
+
+    images = [None] * len(tiled_map.images)
+    sources = {os.path.normpath(path)}
+    for gid, ref in enumerate(tiled_map.images):
+        if ref:
+            filename, rect, flags, colorkey = ref
+            sources.add(os.path.normpath(filename))
+            images[gid] = [os.path.relpath(filename, directory), rect, flags, colorkey]
+    for tileset in ElementTree.parse(path).getroot().iter('tileset'):
+        if tileset.get('source'):
+            sources.add(os.path.normpath(os.path.join(directory, tileset.get('source'))))
+
+    dtype = '<u2' if len(images) <= 1 << 16 else '<u4'
+    layers = []
+    blob = bytearray()
+    for layer in tiled_map.layers:
+        if isinstance(layer, pytmx.TiledTileLayer):
+            gids = np.asarray(layer.data, dtype=dtype)
+            layers.append({'type': 'tiles', 'name': layer.name, 'width': layer.width, 'height': layer.height,
+                           'dtype': dtype, 'offset': len(blob)})
+            blob += gids.tobytes()
+        elif isinstance(layer, pytmx.TiledObjectGroup):
+            layers.append({'type': 'objects', 'name': layer.name,
+                           'objects': [[obj.x, obj.y, obj.width, obj.height, obj.name, obj.gid] for obj in layer]})
+
+    meta = {
+        'sources': {os.path.relpath(source, directory): _fingerprint(source) for source in sorted(sources)},
+        'images': images,
+        'layers': layers,
+    }
+    return meta, bytes(blob)
+
+
+def _read_cache(path):
+    """Metadata and blob of the cache for the TMX at path, or None when missing, stale or unreadable."""
+    try:
+        with open(cache_path(path), 'rb') as cache_file:
+            data = cache_file.read()
+        magic, version, meta_size = CACHE_HEADER.unpack_from(data)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            return None
+        meta = json.loads(data[CACHE_HEADER.size:CACHE_HEADER.size + meta_size])
+        directory = os.path.dirname(path)
+        for source, known in meta['sources'].items():
+            if _fingerprint(os.path.join(directory, source), known)[2] != known[2]:
+                return None
+    except (OSError, ValueError, struct.error):
+        return None
+    return meta, memoryview(data)[CACHE_HEADER.size + meta_size:]
+
+
+def _write_cache(path, meta, blob):
+    encoded = json.dumps(meta, separators=(',', ':')).encode()
+    temporary_path = f'{cache_path(path)}.tmp'
+    try:
+        with open(temporary_path, 'wb') as cache_file:
+            cache_file.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(encoded)))
+            cache_file.write(encoded)
+            cache_file.write(blob)
+        os.replace(temporary_path, cache_path(path))
+    except OSError:
+        # a read-only install just compiles the map on every launch
+        pass
+
+
+def load_tilemap(path, load_image=pygame.image.load):
+    """Loads the TMX at path from its compiled cache next to it, (re)compiling the cache when stale.
+
+    load_image(path) returns the unconverted surface of a tileset image.
+    """
+    cached = _read_cache(path)
+    if cached is None:
+        cached = compile_map(path)
+        _write_cache(path, *cached)
+    return CompiledMap(path, *cached, load_image)
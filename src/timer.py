@@ -1,25 +1,107 @@
-import pygame
+from heapq import heappush, heappop
+from itertools import count
+from time import perf_counter
+
+
+class Scheduler:
+    """Min-heap of callbacks keyed by their deadline on the game clock, in milliseconds.
+
+    The clock only moves when ``advance`` is called once per frame, so it can be paused, sped up
+    or stepped by a fixed dt in tests; only the callbacks that are due get touched.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.now = 0
+        self.time_scale = 1.0
+        self.paused = False
+        self._queue = []
+        self._sequence = count()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def schedule(self, delay, callback):
+        """Calls callback once ``delay`` ms of game time have passed; returns a handle for ``cancel``."""
+        entry = [self.now + delay, next(self._sequence), callback]
+        heappush(self._queue, entry)
+        return entry
+
+    @staticmethod
+    def cancel(entry):
+        # cancelled entries stay in the heap and are skipped when they come due
+        entry[2] = None
+
+    def advance(self, dt):
+        if self.paused:
+            return
+
+        self.now += dt * 1000 * self.time_scale
+        queue = self._queue
+        while queue and queue[0][0] <= self.now:
+            _, __, callback = heappop(queue)
+            if callback is not None:
+                callback()
+
+    def clear(self):
+        self._queue.clear()
+
+
+scheduler = Scheduler()
 
 
 class Timer:
-    def __init__(self, duration, func=None) -> None:
+    def __init__(self, duration, func=None, clock: Scheduler = scheduler) -> None:
         super().__init__()
         self.duration = duration
         self.func = func
         self.start_time = 0
         self.active = False
+        self._clock = clock
+        self._entry = None
 
     def activate(self):
+        """Starts the timer, restarting it when it is already active."""
+        if self._entry is not None:
+            self._clock.cancel(self._entry)
         self.active = True
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self._clock.now
+        self._entry = self._clock.schedule(self.duration, self._expire)
 
     def deactivate(self):
         self.active = False
         self.start_time = 0
+        if self._entry is not None:
+            self._clock.cancel(self._entry)
+            self._entry = None
+
+    def _expire(self):
+        self._entry = None
+        self.deactivate()
+        if self.func:
+            self.func()
+
+
+class StagedJob:
+    """Runs a generator of work steps a few steps at a time, within a wall-clock budget per call.
+
+    Every ``yield`` of the generator marks a point where the job can be suspended until the next frame.
+    """
+
+    def __init__(self, steps) -> None:
+        super().__init__()
+        self._steps = iter(steps)
+        self.done = False
+
+    def run(self, budget_ms):
+        """Advances the job until budget_ms ran out or it is done; at least one step runs per call."""
+        deadline = perf_counter() + budget_ms / 1000
+        for _ in self._steps:
+            if perf_counter() >= deadline:
+                return
+        self.done = True
 
-    def update(self):
-        current_time = pygame.time.get_ticks()
-        if self.active and current_time - self.start_time >= self.duration:
-            self.deactivate()
-            if self.func:
-                self.func()
+    def finish(self):
+        for _ in self._steps:
+            pass
+        self.done = True
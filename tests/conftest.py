@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pygame
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# no window or audio device is opened
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+@pytest.fixture
+def level(monkeypatch):
+    # asset paths are relative to src/
+    monkeypatch.chdir(os.path.join(ROOT, 'src'))
+    from src.level import Level
+    from src.player import PlayerInventoryManager
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    yield Level(PlayerInventoryManager(), seed=0)
+    pygame.quit()
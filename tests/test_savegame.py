@@ -0,0 +1,34 @@
+import pytest
+
+from src.level.savegame import SaveSnapshot, read_save, write_save
+
+
+def test_tree_hit_past_byte_range_still_saves(level, tmp_path):
+    tree = level.tree_sprites.sprites()[0]
+    inventory = level.player.item_inventory
+    for _ in range(140):
+        tree.damage()
+        tree.update(1 / 60)
+
+    assert not tree.alive
+    assert tree.health == 0
+    assert inventory['wood'] in (3, 5)
+
+    # fruit that grows on the stump can still be knocked off
+    tree._add_apple(tree.rect.topleft)
+    apples = inventory['apple']
+    tree.damage()
+    tree.update(1 / 60)
+    assert inventory['apple'] == apples + 1
+    assert inventory['wood'] in (3, 5)
+
+    path = str(tmp_path / 'world.sav')
+    write_save(path, SaveSnapshot.take(level))
+    assert 0 in [state['health'] for state in read_save(path).trees.values()]
+
+
+def test_save_for_another_soil_grid_is_rejected(level):
+    snapshot = SaveSnapshot.take(level)
+    snapshot.grid = snapshot.grid[:-1]
+    with pytest.raises(ValueError, match='soil grid'):
+        snapshot.apply(level)